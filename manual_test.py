@@ -1 +1,94 @@
-# TODO: Add manual test script
+"""Manual smoke test against the live Brandfetch API.
+
+Requires BRANDFETCH_API_KEY (and BRANDFETCH_CLIENT_ID for get_logo_url) in
+the environment or .env. Run with: python manual_test.py
+"""
+
+import asyncio
+
+from brandfetch_mcp.client import BrandfetchClient
+from brandfetch_mcp import brandfetch_logo_lookup_checked
+
+
+async def test_get_brand(client: BrandfetchClient) -> list[str]:
+    brand = await client.get_brand("github.com")
+    return [
+        f"Brand: {brand.get('name')}",
+        f"Logos: {len(brand.get('logos', []))}",
+        f"Colors: {len(brand.get('colors', []))}",
+    ]
+
+
+async def test_search_brands(client: BrandfetchClient) -> list[str]:
+    results = await client.search_brands("coffee", limit=3)
+    lines = [f"Found {len(results)} results"]
+    for r in results[:3]:
+        lines.append(f"  - {r.get('name')}: {r.get('domain')}")
+    return lines
+
+
+async def test_get_brand_logo(client: BrandfetchClient) -> list[str]:
+    logo = await client.get_brand_logo("stripe.com", format="svg")
+    return [
+        f"Logo URL: {logo['url'][:60]}...",
+        f"Format: {logo['format']}, Theme: {logo['theme']}",
+    ]
+
+
+async def test_get_brand_colors(client: BrandfetchClient) -> list[str]:
+    colors = await client.get_brand_colors("netflix.com")
+    lines = [f"Found {len(colors)} colors"]
+    for c in colors[:3]:
+        lines.append(f"  {c.get('hex')} ({c.get('type')})")
+    return lines
+
+
+async def test_get_logo_url(client: BrandfetchClient) -> list[str]:
+    result = await brandfetch_logo_lookup_checked.get_logo_for_domain("github.com")
+    if "error" in result:
+        raise RuntimeError(result.get("message", result["error"]))
+    return [
+        f"Logo URL: {result.get('logo_url')}",
+        f"Source: {result.get('source')}",
+    ]
+
+
+TESTS = [
+    ("get_brand", test_get_brand),
+    ("search_brands", test_search_brands),
+    ("get_brand_logo", test_get_brand_logo),
+    ("get_brand_colors", test_get_brand_colors),
+    ("get_logo_url", test_get_logo_url),
+]
+
+
+async def main():
+    # One client for every check so the requests share pooled connections
+    client = BrandfetchClient()
+
+    # The checks are independent and network-bound, so run them concurrently;
+    # output is printed afterwards to keep it readable.
+    outcomes = await asyncio.gather(
+        *(test(client) for _, test in TESTS), return_exceptions=True
+    )
+
+    results = []
+    for (name, _), outcome in zip(TESTS, outcomes):
+        print(f"\n=== Testing {name} ===")
+        if isinstance(outcome, BaseException):
+            print(f"Error: {outcome}")
+            results.append((name, False))
+        else:
+            print("\n".join(outcome))
+            results.append((name, True))
+
+    await client.aclose()
+    await brandfetch_logo_lookup_checked.aclose()
+
+    print("\n=== Summary ===")
+    for name, ok in results:
+        print(f"  {'✅' if ok else '❌'} {name}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -17,17 +17,28 @@ Configuration (env vars):
 - BRAND_API_WARN_THRESHOLD: integer (default 90)
 - BRANDFETCH_REQUEST_TIMEOUT_SEC: integer seconds for HTTP requests (default 8)
 """
+import asyncio
+import atexit
 import os
 import re
-import json
 import sqlite3
-from datetime import datetime
+import threading
+import time
+from datetime import datetime, timezone
+from itertools import chain
 from typing import Any, Dict, List, Optional
-from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
+from urllib.parse import urlencode, urlsplit, urlunsplit
 import logging
 
 # Use httpx instead of requests for async compatibility
 import httpx
+import orjson
+from cachetools import TTLCache
+
+from .client import _ensure_env
+
+# The config below is read at import, so .env has to be loaded first
+_ensure_env()
 
 # Configure logging
 logger = logging.getLogger("brandfetch-logo-lookup")
@@ -43,12 +54,68 @@ BRAND_API_MONTH_LIMIT = int(os.getenv("BRAND_API_MONTH_LIMIT", "100"))
 BRAND_API_WARN_THRESHOLD = int(os.getenv("BRAND_API_WARN_THRESHOLD", "90"))
 REQUEST_TIMEOUT = int(os.getenv("BRANDFETCH_REQUEST_TIMEOUT_SEC", "8"))
 
-IMAGE_EXTENSIONS = (".png", ".svg", ".jpg", ".jpeg", ".webp", ".gif", ".ico")
+
+# ----------------------
+# URL templates
+# ----------------------
+def _url_formatter(template: str, field: str):
+    """
+    Return a callable that fills `field` into `template`.
+    Single-placeholder templates (the defaults) are split once so each call
+    is a plain concatenation; anything else falls back to str.format.
+    """
+    placeholder = "{" + field + "}"
+    if template.count("{") == 1 and template.count("}") == 1 and placeholder in template:
+        prefix, suffix = template.split(placeholder)
+        return lambda value: prefix + value + suffix
+    return lambda value: template.format(**{field: value})
+
+
+_format_logo_url = _url_formatter(LOGO_API_URL, "domain")
+_format_brand_url = _url_formatter(BRAND_API_URL, "q")
+
+
+# ----------------------
+# Shared HTTP client (connection pooling / keep-alive)
+# ----------------------
+# Per-phase httpx timeouts are a backstop; _REQUEST_DEADLINE bounds the whole
+# request (DNS, TLS, pool wait and body) so one slow origin cannot hold a
+# pooled connection indefinitely.
+_REQUEST_DEADLINE = REQUEST_TIMEOUT + 0.5
+
+# Created on first use so importing the module does not build an SSL context
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_http() -> httpx.AsyncClient:
+    """Return the shared HTTP/2 client, creating it on first use."""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            # Pool waits get the full request timeout: a burst queuing for a
+            # connection must not look like a logo API failure, which would
+            # fall through to the quota-limited Brand API
+            timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=min(2.0, REQUEST_TIMEOUT)),
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+            http2=True,
+        )
+    return _http_client
+
+
+async def aclose() -> None:
+    """Close the shared HTTP client and release pooled connections."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
 
 
 # ----------------------
 # Client ID helper for hotlinking compliance
 # ----------------------
+_CDN_PREFIXES = ("https://cdn.brandfetch.io/", "http://cdn.brandfetch.io/")
+
+
 def _append_client_id(url: str) -> str:
     """
     Append client ID to CDN URLs for Brandfetch hotlinking compliance.
@@ -58,24 +125,54 @@ def _append_client_id(url: str) -> str:
         if "cdn.brandfetch.io" in url:
             logger.warning("Logo URL returned without client ID - may violate Brandfetch ToS. Set BRANDFETCH_CLIENT_ID for compliance")
         return url
-    
-    parsed = urlparse(url)
-    if "cdn.brandfetch.io" not in parsed.netloc:
+
+    # Fast path: a plain CDN URL with no fragment or existing c= param only
+    # needs the param appended.
+    client_param = urlencode({"c": CLIENT_ID})
+    if url.startswith(_CDN_PREFIXES) and "#" not in url and "c=" not in url:
+        sep = "&" if "?" in url else "?"
+        return f"{url}{sep}{client_param}"
+
+    parts = urlsplit(url)
+    if "cdn.brandfetch.io" not in parts.netloc:
         return url
-    
-    # Parse existing query parameters
-    query_params = parse_qs(parsed.query)
-    query_params['c'] = [CLIENT_ID]
-    
-    # Rebuild URL with client ID
-    new_parsed = parsed._replace(query=urlencode(query_params, doseq=True))
-    return urlunparse(new_parsed)
+
+    # Drop any existing c= param, keeping the rest of the query as-is
+    query = "&".join(p for p in parts.query.split("&") if p and not p.startswith("c="))
+    query = f"{query}&{client_param}" if query else client_param
+    return urlunsplit(parts._replace(query=query))
 
 
 # ----------------------
 # Database (SQLite) for usage counting
 # ----------------------
-def _init_db(conn: sqlite3.Connection) -> None:
+# UPSERT ... RETURNING needs SQLite 3.35+
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Statement text kept constant so sqlite3's per-connection statement cache
+# reuses the prepared statements instead of re-parsing them.
+_SQL_SELECT = "SELECT count FROM brand_api_usage WHERE month = ?"
+_SQL_UPSERT = (
+    "INSERT INTO brand_api_usage (month, count) VALUES (?, ?) "
+    "ON CONFLICT(month) DO UPDATE SET count = brand_api_usage.count + excluded.count "
+    "RETURNING count"
+)
+_SQL_INSERT_ZERO = "INSERT OR IGNORE INTO brand_api_usage (month, count) VALUES (?, 0)"
+_SQL_ADD = "UPDATE brand_api_usage SET count = count + ? WHERE month = ?"
+# Compare-and-increment: adds one only while count < limit, so no row is
+# returned once the limit is reached. SELECT ... WHERE keeps a limit of 0
+# from inserting the first row.
+_SQL_RESERVE = (
+    "INSERT INTO brand_api_usage (month, count) SELECT ?, 1 WHERE ? > 0 "
+    "ON CONFLICT(month) DO UPDATE SET count = brand_api_usage.count + 1 "
+    "WHERE brand_api_usage.count < ? "
+    "RETURNING count"
+)
+_SQL_ADD_BELOW = "UPDATE brand_api_usage SET count = count + 1 WHERE month = ? AND count < ?"
+
+
+def _init_db(conn: sqlite3.Connection, path: str) -> None:
+    """Create the usage table and switch the file to WAL; run per new connection."""
     with conn:
         conn.execute(
             """
@@ -85,85 +182,139 @@ def _init_db(conn: sqlite3.Connection) -> None:
             )
             """
         )
+    # WAL lets readers proceed alongside a writer and is persisted in the
+    # file; it does not apply to in-memory databases.
+    if path != ":memory:":
+        conn.execute("PRAGMA journal_mode=WAL")
+
+
+# Process-wide connection, reopened only if DB_PATH changes
+_conn: Optional[sqlite3.Connection] = None
+_conn_path: Optional[str] = None
+_conn_lock = threading.Lock()
 
 
 def _get_conn() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH, timeout=5, check_same_thread=False)
-    _init_db(conn)
-    return conn
+    global _conn, _conn_path
+    with _conn_lock:
+        if _conn is None or _conn_path != DB_PATH:
+            if _conn is not None:
+                _conn.close()
+            # timeout=5 doubles as the busy timeout for lock contention
+            conn = sqlite3.connect(DB_PATH, timeout=5, check_same_thread=False, cached_statements=256)
+            # Per-connection settings: one fsync per WAL checkpoint instead of
+            # per commit, and temp tables kept in memory.
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            _init_db(conn, DB_PATH)
+            _conn, _conn_path = conn, DB_PATH
+        return _conn
+
+
+def _close_conn() -> None:
+    """Close the shared SQLite connection, if open."""
+    global _conn, _conn_path
+    with _conn_lock:
+        if _conn is not None:
+            _conn.close()
+        _conn, _conn_path = None, None
+
+
+atexit.register(_close_conn)
+
+
+# Current "YYYY-MM" and the epoch time at which it rolls over
+_month: str = ""
+_month_ends: float = 0.0
+
+
+def _current_month() -> str:
+    """Return the current UTC month, recomputed only when a month ends."""
+    global _month, _month_ends
+    if time.time() >= _month_ends:
+        now = datetime.now(timezone.utc)
+        if now.month == 12:
+            next_month = now.replace(year=now.year + 1, month=1)
+        else:
+            next_month = now.replace(month=now.month + 1)
+        next_month = next_month.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        _month, _month_ends = now.strftime("%Y-%m"), next_month.timestamp()
+    return _month
 
 
 def get_brand_count() -> int:
     """Get current month's Brand API usage count."""
-    month = datetime.utcnow().strftime("%Y-%m")
+    month = _current_month()
     conn = _get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT count FROM brand_api_usage WHERE month = ?", (month,))
-    row = cur.fetchone()
-    conn.close()
+    row = conn.execute(_SQL_SELECT, (month,)).fetchone()
     return int(row[0]) if row else 0
 
 
 def increment_brand_counter(delta: int = 1) -> int:
     """Increment Brand API usage counter and return new count."""
-    month = datetime.utcnow().strftime("%Y-%m")
+    month = _current_month()
     conn = _get_conn()
     with conn:
-        cur = conn.execute("SELECT count FROM brand_api_usage WHERE month = ?", (month,))
-        row = cur.fetchone()
-        if row:
-            new_count = int(row[0]) + delta
-            conn.execute("UPDATE brand_api_usage SET count = ? WHERE month = ?", (new_count, month))
+        if _HAS_RETURNING:
+            row = conn.execute(_SQL_UPSERT, (month, delta)).fetchone()
         else:
-            new_count = delta
-            conn.execute("INSERT INTO brand_api_usage (month, count) VALUES (?, ?)", (month, new_count))
-    conn.close()
-    return new_count
+            conn.execute(_SQL_INSERT_ZERO, (month,))
+            conn.execute(_SQL_ADD, (delta, month))
+            row = conn.execute(_SQL_SELECT, (month,)).fetchone()
+    return int(row[0])
+
+
+def reserve_brand_call(limit: int) -> Optional[int]:
+    """
+    Atomically count one Brand API call if the month is under limit.
+    Returns the new count, or None if the limit has been reached.
+    """
+    month = _current_month()
+    conn = _get_conn()
+    with conn:
+        if _HAS_RETURNING:
+            row = conn.execute(_SQL_RESERVE, (month, limit, limit)).fetchone()
+        else:
+            conn.execute(_SQL_INSERT_ZERO, (month,))
+            if conn.execute(_SQL_ADD_BELOW, (month, limit)).rowcount == 0:
+                return None
+            row = conn.execute(_SQL_SELECT, (month,)).fetchone()
+    return int(row[0]) if row else None
 
 
 # ----------------------
 # Helpers for parsing and extracting image URLs from API responses
 # ----------------------
 URL_RE = re.compile(r"https?://[^\s'\"<>]+", flags=re.IGNORECASE)
+_json_loads = orjson.loads
 
 
 def _find_image_urls_in_obj(obj: Any) -> List[str]:
     """
-    Recursively search a JSON-like object for strings that look like image URLs.
-    Returns a list of candidate URLs (may contain duplicates).
+    Walk a JSON-like object for strings that look like image URLs.
+    Returns a de-duplicated list of candidate URLs in document order.
     """
     found = []
-
-    if isinstance(obj, str):
-        # quick check for direct URL and image extension
-        if obj.startswith("http://") or obj.startswith("https://"):
-            if obj.lower().endswith(IMAGE_EXTENSIONS) or any(ext in obj.lower() for ext in IMAGE_EXTENSIONS):
-                found.append(obj)
+    # Explicit stack instead of recursion; children are pushed in reverse so
+    # they pop in their original order.
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if isinstance(o, str):
+            # Every URL is a candidate: image endpoints often have no
+            # extension, so there is no point testing for one.
+            if o.startswith(("http://", "https://")):
+                found.append(o)
             else:
-                # also allow image URLs without extension (e.g., endpoints that deliver images)
-                found.append(obj)
-        else:
-            # extract embedded URLs from strings
-            for m in URL_RE.findall(obj):
-                if m.lower().endswith(IMAGE_EXTENSIONS) or any(ext in m.lower() for ext in IMAGE_EXTENSIONS):
-                    found.append(m)
-                else:
-                    found.append(m)
-    elif isinstance(obj, dict):
-        for v in obj.values():
-            found.extend(_find_image_urls_in_obj(v))
-    elif isinstance(obj, list):
-        for item in obj:
-            found.extend(_find_image_urls_in_obj(item))
+                # extract embedded URLs from strings
+                found.extend(URL_RE.findall(o))
+        elif isinstance(o, dict):
+            stack.extend(reversed(o.values()))
+        elif isinstance(o, list):
+            stack.extend(reversed(o))
 
     # Deduplicate while preserving order
-    seen = set()
-    out = []
-    for u in found:
-        if u not in seen:
-            seen.add(u)
-            out.append(u)
-    return out
+    return list(dict.fromkeys(found))
 
 
 def _extract_best_logo_from_response(resp_json: Any) -> Optional[str]:
@@ -186,6 +337,26 @@ def _extract_best_logo_from_response(resp_json: Any) -> Optional[str]:
     return candidates[0] if candidates else None
 
 
+def _parse_json(resp: httpx.Response) -> Optional[Any]:
+    """
+    Parse a response body as JSON, or return None if it isn't JSON.
+    The content-type is ignored since it is often missing or mis-set; the
+    first non-blank byte decides whether a parse is worth attempting.
+    """
+    body = resp.content
+    if not body:
+        return None
+    first = body[:1]
+    if first in b" \t\r\n":
+        first = body.lstrip()[:1]
+    if first not in (b"{", b"["):
+        return None
+    try:
+        return _json_loads(body)
+    except orjson.JSONDecodeError:
+        return None
+
+
 # ----------------------
 # API callers (async)
 # ----------------------
@@ -194,49 +365,37 @@ async def call_logo_api(domain: str) -> Dict[str, Any]:
     Call the logo-by-domain endpoint. Returns dict with keys:
     - status_code
     - json (if parseable) or None
-    - text (raw text) if available
     - candidates (list of image URLs found)
     """
     if not LOGO_API_KEY:
         raise RuntimeError("Missing BRANDFETCH_CLIENT_ID environment variable")
 
-    url = LOGO_API_URL.format(domain=domain)
+    url = _format_logo_url(domain)
     headers = {"Authorization": f"Bearer {LOGO_API_KEY}"}
     
     try:
-        async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
-            resp = await client.get(url, headers=headers)
+        resp = await asyncio.wait_for(_get_http().get(url, headers=headers), _REQUEST_DEADLINE)
     except Exception as ex:
-        logger.warning(f"Logo API network error for {domain}: {ex}")
+        logger.warning("Logo API network error for %s: %s", domain, ex)
         return {"status_code": None, "error": str(ex), "json": None, "candidates": []}
 
-    content_type = resp.headers.get("content-type", "")
-    parsed = None
-    if "application/json" in content_type:
-        try:
-            parsed = resp.json()
-        except Exception:
-            parsed = None
-    else:
-        # try to parse JSON even if content-type is missing/mis-set
-        try:
-            parsed = resp.json()
-        except Exception:
-            parsed = None
+    parsed = _parse_json(resp)
 
     parsed_candidates = _find_image_urls_in_obj(parsed) if parsed else []
-    text_candidates = _find_image_urls_in_obj(resp.text if resp.text else "")
+    # The raw text only needs scanning when it isn't JSON; parsed JSON
+    # already yields every URL in the body.
+    text_candidates = _find_image_urls_in_obj(resp.text) if parsed is None and resp.content else []
 
-    all_candidates = []
-    for c in parsed_candidates + text_candidates:
-        if c not in all_candidates:
-            # Apply client ID for hotlinking compliance
-            all_candidates.append(_append_client_id(c))
+    # Apply client ID for hotlinking compliance, de-duplicating in order
+    seen: Dict[str, str] = {}
+    for c in chain(parsed_candidates, text_candidates):
+        if c not in seen:
+            seen[c] = _append_client_id(c)
+    all_candidates = list(seen.values())
 
     return {
         "status_code": resp.status_code,
         "json": parsed,
-        "text": resp.text,
         "candidates": all_candidates,
     }
 
@@ -248,42 +407,32 @@ async def call_brand_api_search(query: str) -> Dict[str, Any]:
     if not BRAND_API_KEY:
         raise RuntimeError("Missing BRANDFETCH_API_KEY environment variable")
 
-    url = BRAND_API_URL.format(q=query)
+    url = _format_brand_url(query)
     headers = {"Authorization": f"Bearer {BRAND_API_KEY}"}
     
     try:
-        async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
-            resp = await client.get(url, headers=headers)
+        resp = await asyncio.wait_for(_get_http().get(url, headers=headers), _REQUEST_DEADLINE)
     except Exception as ex:
-        logger.warning(f"Brand API network error for query '{query}': {ex}")
+        logger.warning("Brand API network error for query '%s': %s", query, ex)
         return {"status_code": None, "error": str(ex), "json": None, "candidates": []}
 
-    parsed = None
-    content_type = resp.headers.get("content-type", "")
-    if "application/json" in content_type:
-        try:
-            parsed = resp.json()
-        except Exception:
-            parsed = None
-    else:
-        try:
-            parsed = resp.json()
-        except Exception:
-            parsed = None
+    parsed = _parse_json(resp)
 
     parsed_candidates = _find_image_urls_in_obj(parsed) if parsed else []
-    text_candidates = _find_image_urls_in_obj(resp.text if resp.text else "")
+    # The raw text only needs scanning when it isn't JSON; parsed JSON
+    # already yields every URL in the body.
+    text_candidates = _find_image_urls_in_obj(resp.text) if parsed is None and resp.content else []
 
-    all_candidates = []
-    for c in parsed_candidates + text_candidates:
-        if c not in all_candidates:
-            # Apply client ID for hotlinking compliance
-            all_candidates.append(_append_client_id(c))
+    # Apply client ID for hotlinking compliance, de-duplicating in order
+    seen: Dict[str, str] = {}
+    for c in chain(parsed_candidates, text_candidates):
+        if c not in seen:
+            seen[c] = _append_client_id(c)
+    all_candidates = list(seen.values())
 
     return {
         "status_code": resp.status_code,
         "json": parsed,
-        "text": resp.text,
         "candidates": all_candidates,
     }
 
@@ -291,6 +440,17 @@ async def call_brand_api_search(query: str) -> Dict[str, Any]:
 # ----------------------
 # Matching logic
 # ----------------------
+_HOST_KEYS = ("host", "domain", "website", "url")
+
+
+def _has_matching_host(d: Dict[str, Any], domain: str) -> bool:
+    """True if any of d's host-like fields contains the (lowercased) domain."""
+    return any(
+        isinstance(v := d.get(k), str) and domain in v.lower()
+        for k in _HOST_KEYS
+    )
+
+
 def _domain_matches_logo_candidates(domain: str, candidates: List[str], resp_json: Optional[Any] = None) -> bool:
     """
     Heuristic match:
@@ -298,24 +458,18 @@ def _domain_matches_logo_candidates(domain: str, candidates: List[str], resp_jso
     - resp_json contains a 'domain'/'host' field matching the domain.
     """
     domain = domain.lower()
-    for c in candidates:
-        if not c:
-            continue
-        if domain in c.lower():
-            return True
+    # Lowercase all candidates in one pass; a domain never contains a
+    # newline, so it cannot match across two joined URLs.
+    if candidates and domain in "\n".join(filter(None, candidates)).lower():
+        return True
 
     # check parsed json for obvious host/domain fields
     if isinstance(resp_json, dict):
-        for k in ("host", "domain", "website", "url"):
-            v = resp_json.get(k)
-            if isinstance(v, str) and domain in v.lower():
-                return True
-        data = resp_json.get("data") or resp_json.get("brand") or {}
+        if _has_matching_host(resp_json, domain):
+            return True
+        data = resp_json.get("data") or resp_json.get("brand")
         if isinstance(data, dict):
-            for k in ("host", "domain", "website", "url"):
-                v = data.get(k)
-                if isinstance(v, str) and domain in v.lower():
-                    return True
+            return _has_matching_host(data, domain)
 
     return False
 
@@ -323,72 +477,151 @@ def _domain_matches_logo_candidates(domain: str, candidates: List[str], resp_jso
 # ----------------------
 # Public wrapper
 # ----------------------
+# Completed lookups keyed by (domain, company_hint). Only definitive outcomes
+# (a logo, or no_logo_found) are cached; quota and network errors are
+# transient and always retried. brand_api_calls_this_month in a cached result
+# reflects the count at lookup time.
+_LOGO_CACHE: TTLCache = TTLCache(maxsize=4096, ttl=3600)
+
+# In-flight lookups keyed by (domain, company_hint); concurrent identical
+# requests await the same task instead of issuing duplicate API calls.
+_inflight: Dict[tuple, "asyncio.Task[Dict[str, Any]]"] = {}
+
+
+# Serializes the Brand API fallback (quota reservation and call) within this
+# process. Recreated if the running event loop changes.
+_brand_api_lock: Optional[asyncio.Lock] = None
+_brand_api_lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_brand_api_lock() -> asyncio.Lock:
+    global _brand_api_lock, _brand_api_lock_loop
+    loop = asyncio.get_running_loop()
+    if _brand_api_lock is None or _brand_api_lock_loop is not loop:
+        _brand_api_lock, _brand_api_lock_loop = asyncio.Lock(), loop
+    return _brand_api_lock
+
+
 async def get_logo_for_domain(domain: str, company_hint: Optional[str] = None) -> Dict[str, Any]:
     """
     Orchestrator:
     1) Try logo-by-domain.
     2) If found and matches, return it with source 'domain-logo'.
     3) Otherwise, check Brand API usage and optionally call Brand API search.
+
+    Results are cached for an hour, and concurrent calls for the same
+    domain/hint share a single lookup.
     """
     domain = domain.strip().lower()
     if not domain:
         return {"error": "invalid_domain", "message": "Empty domain provided"}
 
-    logger.info(f"Starting logo lookup for domain: {domain}")
+    key = (domain, company_hint)
+    cached = _LOGO_CACHE.get(key)
+    if cached is not None:
+        return cached
 
-    # 1) domain logo lookup
-    domain_resp = await call_logo_api(domain)
-    domain_candidates = domain_resp.get("candidates", []) or []
-    
-    if domain_resp.get("status_code") == 200 and domain_candidates:
-        if _domain_matches_logo_candidates(domain, domain_candidates, domain_resp.get("json")):
-            logger.info(f"Found matching logo via domain lookup for {domain}")
-            return {
-                "logo_url": domain_candidates[0],
-                "source": "domain-logo",
-                "reason": "domain lookup returned matching candidate",
-                "domain_resp": {"status_code": domain_resp.get("status_code")},
-                "brand_api_calls_this_month": get_brand_count(),
-            }
-
-    # 2) Brand API fallback
-    current_count = get_brand_count()
-    if current_count >= BRAND_API_MONTH_LIMIT:
-        logger.warning(f"Brand API limit reached ({BRAND_API_MONTH_LIMIT}) for {domain}")
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_lookup_and_cache(key, domain, company_hint))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield so one cancelled caller does not cancel the lookup for the others
+    return await asyncio.shield(task)
+
+
+async def _lookup_and_cache(key: tuple, domain: str, company_hint: Optional[str]) -> Dict[str, Any]:
+    result = await _lookup_logo(domain, company_hint)
+    if "logo_url" in result or result.get("error") == "no_logo_found":
+        _LOGO_CACHE[key] = result
+    return result
+
+
+_NON_DOMAIN_CHARS = re.compile(r"[^a-z0-9-]")
+
+
+def _guess_domain(name: str) -> Optional[str]:
+    """name + ".com" for a bare brand name ("Coca Cola" -> "cocacola.com"), else None."""
+    if "." in name:
+        return None
+    stem = _NON_DOMAIN_CHARS.sub("", name.lower())
+    return f"{stem}.com" if stem else None
+
+
+async def _lookup_logo(domain: str, company_hint: Optional[str]) -> Dict[str, Any]:
+    """Perform the logo lookup for an already-normalized domain."""
+    logger.info("Starting logo lookup for domain: %s", domain)
+
+    # 1) domain logo lookup; a bare brand name also probes its guessed .com
+    # domain concurrently, and the first match in that order wins
+    domains = [domain]
+    guess = _guess_domain(domain) if company_hint else None
+    if guess:
+        domains.append(guess)
+    responses = await asyncio.gather(*(call_logo_api(d) for d in domains))
+
+    for lookup_domain, domain_resp in zip(domains, responses):
+        domain_candidates = domain_resp.get("candidates", []) or []
+        if domain_resp.get("status_code") == 200 and domain_candidates:
+            if _domain_matches_logo_candidates(lookup_domain, domain_candidates, domain_resp.get("json")):
+                logger.info("Found matching logo via domain lookup for %s", lookup_domain)
+                return {
+                    "logo_url": domain_candidates[0],
+                    "source": "domain-logo",
+                    "reason": "domain lookup returned matching candidate",
+                    "domain_resp": {"status_code": domain_resp.get("status_code")},
+                    "brand_api_calls_this_month": get_brand_count(),
+                }
+
+    # 2) Brand API fallback, one at a time
+    async with _get_brand_api_lock():
+        return await _brand_api_fallback(domain, company_hint)
+
+
+async def _brand_api_fallback(domain: str, company_hint: Optional[str]) -> Dict[str, Any]:
+    """Check the monthly quota and, if allowed, search the Brand API."""
+    # Reserve the call up front so the quota holds across processes too; it
+    # is handed back below if the request never reaches the API.
+    new_count = reserve_brand_call(BRAND_API_MONTH_LIMIT)
+    if new_count is None:
+        logger.warning("Brand API limit reached (%s) for %s", BRAND_API_MONTH_LIMIT, domain)
         return {
             "error": "brand_api_limit_reached",
             "message": f"Brand API monthly limit reached ({BRAND_API_MONTH_LIMIT}).",
-            "brand_api_calls_this_month": current_count,
+            "brand_api_calls_this_month": get_brand_count(),
         }
 
     warning = None
-    if current_count >= BRAND_API_WARN_THRESHOLD:
+    if new_count > BRAND_API_WARN_THRESHOLD:
         warning = "warning: approaching Brand API monthly limit"
-        logger.warning(f"Approaching Brand API limit: {current_count}/{BRAND_API_MONTH_LIMIT}")
+        logger.warning("Approaching Brand API limit: %s/%s", new_count - 1, BRAND_API_MONTH_LIMIT)
 
     query = company_hint or domain
-    logger.info(f"Falling back to Brand API search for query: {query}")
-    brand_resp = await call_brand_api_search(query)
+    logger.info("Falling back to Brand API search for query: %s", query)
+    try:
+        brand_resp = await call_brand_api_search(query)
+    except BaseException:
+        # Missing key, deadline cancellation, etc.: the call never counted
+        increment_brand_counter(-1)
+        raise
 
-    # If brand_resp had no status_code (e.g., network error), return that error without incrementing.
+    # If brand_resp had no status_code (e.g., network error), refund the reserved call.
     if brand_resp.get("status_code") is None:
-        logger.error(f"Brand API network error for {domain}: {brand_resp.get('error')}")
+        logger.error("Brand API network error for %s: %s", domain, brand_resp.get("error"))
         return {
             "error": "brand_api_network_error",
             "message": brand_resp.get("error", "network error while calling Brand API"),
-            "brand_api_calls_this_month": current_count,
+            "brand_api_calls_this_month": increment_brand_counter(-1),
         }
 
-    # increment usage because we performed a Brand API call that returned a response
-    new_count = increment_brand_counter(1)
-    logger.info(f"Incremented Brand API count to {new_count}")
+    logger.info("Brand API count is now %s", new_count)
 
     # pick best candidate
     brand_candidates = brand_resp.get("candidates", []) or []
     best = brand_candidates[0] if brand_candidates else None
     
     if best:
-        logger.info(f"Found logo via Brand API fallback for {domain}: {best}")
+        logger.info("Found logo via Brand API fallback for %s: %s", domain, best)
         return {
             "logo_url": best,
             "source": "brand-search",
@@ -399,7 +632,7 @@ async def get_logo_for_domain(domain: str, company_hint: Optional[str] = None) -
         }
 
     # no logo found in Brand API response
-    logger.warning(f"No logo found for {domain} in domain or Brand API search")
+    logger.warning("No logo found for %s in domain or Brand API search", domain)
     return {
         "error": "no_logo_found",
         "message": "No logo candidate was found from domain lookup or Brand API search",
@@ -408,10 +641,19 @@ async def get_logo_for_domain(domain: str, company_hint: Optional[str] = None) -
     }
 
 
+async def get_logos_for_domains(domains: List[str]) -> List[Dict[str, Any]]:
+    """
+    Look up logos for several domains at once, returning results in input
+    order. Logo API calls run concurrently; any Brand API fallbacks still
+    run one at a time against the monthly quota.
+    """
+    return list(await asyncio.gather(*(get_logo_for_domain(d) for d in domains)))
+
+
 def get_status() -> Dict[str, Any]:
     """Get current usage status."""
     current_count = get_brand_count()
-    month = datetime.utcnow().strftime("%Y-%m")
+    month = _current_month()
     
     return {
         "brand_api_calls_this_month": current_count,
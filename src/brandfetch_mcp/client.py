@@ -1,14 +1,141 @@
+import asyncio
+import logging
 import os
+import random
+import re
+import time
+from functools import lru_cache
 import httpx
-from typing import Dict, Any, List, Optional
-from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
+import orjson
+from cachetools import TTLCache
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import quote, urlencode, urlsplit, urlunsplit
 from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+logger = logging.getLogger("brandfetch-client")
+
+# .env is read on first client construction rather than at import; the
+# server and the logo lookup module share this guard, so it is scanned once
+_DOTENV_LOADED = False
+
+
+def _ensure_env() -> None:
+    """Load environment variables from .env once per process."""
+    global _DOTENV_LOADED
+    if not _DOTENV_LOADED:
+        load_dotenv()
+        _DOTENV_LOADED = True
+
+
+_CDN_PREFIXES = ("https://cdn.brandfetch.io/", "http://cdn.brandfetch.io/")
+# Any scheme is dropped; the host may be empty so "https://" cleans to ""
+# rather than backtracking to capture the scheme as the host
+_DOMAIN_RE = re.compile(r"^\s*(?:[a-z][a-z0-9+.-]*://)?(?:www\.)?([^:/?#\s]*)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=2048)
+def _clean_domain(domain: str) -> str:
+    """Host part of a bare domain or URL, minus scheme, www., port and path."""
+    m = _DOMAIN_RE.match(domain)
+    return m.group(1).lower() if m else ""
+
+
+# Transient statuses worth retrying, with exponential backoff bounds (seconds)
+_RETRY_STATUSES = frozenset({429, 502, 503, 504})
+_RETRY_BASE = 1.0
+_RETRY_CAP = 30.0
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds from a numeric Retry-After header, if present."""
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+# A logo paired with its formats keyed by name (first occurrence wins)
+_LogoEntry = Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]
+# (by (type, theme), by type, first logo): each maps to the first matching logo
+_LogoIndex = Tuple[Dict[tuple, _LogoEntry], Dict[Any, _LogoEntry], Optional[_LogoEntry]]
+
+
+def _index_logos(logos: List[Dict[str, Any]]) -> _LogoIndex:
+    """Index a brand's logos for get_brand_logo's theme/type/any fallbacks."""
+    by_type_theme: Dict[tuple, _LogoEntry] = {}
+    by_type: Dict[Any, _LogoEntry] = {}
+    first: Optional[_LogoEntry] = None
+    for logo in logos:
+        formats: Dict[str, Dict[str, Any]] = {}
+        for fmt in logo.get("formats") or []:
+            formats.setdefault(fmt.get("format"), fmt)
+        entry = (logo, formats)
+        by_type_theme.setdefault((logo.get("type"), logo.get("theme")), entry)
+        by_type.setdefault(logo.get("type"), entry)
+        if first is None:
+            first = entry
+    return by_type_theme, by_type, first
+
+
+def _enhance_colors(colors: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Brand colors with missing type/brightness filled in as "unknown"."""
+    return [
+        {
+            "hex": color.get("hex"),
+            "type": color.get("type", "unknown"),
+            "brightness": color.get("brightness", "unknown")
+        }
+        for color in colors
+    ]
+
+
+class _TokenBucket:
+    """Async token bucket: `rate` requests per second with bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        # Waiters queue on the lock, so tokens are handed out in FIFO order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+_DEFAULT_MAX_RPS = 10.0
+
+
+def _max_rps() -> float:
+    """BRANDFETCH_MAX_RPS, or the default if it is malformed or not positive."""
+    raw = os.getenv("BRANDFETCH_MAX_RPS")
+    if raw is None:
+        return _DEFAULT_MAX_RPS
+    try:
+        rate = float(raw)
+    except ValueError:
+        rate = 0.0
+    if not rate > 0:
+        logger.warning("Invalid BRANDFETCH_MAX_RPS %r; using %s", raw, _DEFAULT_MAX_RPS)
+        return _DEFAULT_MAX_RPS
+    return rate
+
 
 class BrandfetchClient:
     def __init__(self):
+        _ensure_env()
         self.base_url = "https://api.brandfetch.io/v2"
         # Use Brand API key for /brands and /search endpoints
         self.api_key = os.getenv("BRANDFETCH_API_KEY")
@@ -17,152 +144,245 @@ class BrandfetchClient:
         if not self.api_key:
             raise ValueError("BRANDFETCH_API_KEY must be set in .env")
         
-        self.headers = {
+        self.headers = httpx.Headers({
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
-        }
+        })
+        self._brands_url = f"{self.base_url}/brands/"
+        self._search_url = f"{self.base_url}/search"
+
+        # One pooled client per instance so requests reuse connections;
+        # HTTP/2 lets concurrent requests share a single connection. Idle
+        # connections are kept for a minute to survive the pauses between
+        # tool calls, and failed connection attempts are retried.
+        self._client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=httpx.Timeout(30.0, connect=5.0, write=10.0, pool=5.0),
+            transport=httpx.AsyncHTTPTransport(
+                http2=True,
+                retries=3,
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=50, keepalive_expiry=60.0),
+            ),
+        )
+
+        # Client-side rate limit so bursts wait locally instead of drawing 429s
+        rate = _max_rps()
+        self._rate_limiter = _TokenBucket(rate, capacity=max(1.0, rate * 2))
+
+        # Retries for 429/5xx responses; 0 disables
+        self.max_retries = 3
+
+        # [brand JSON, logo index or None] by cleaned domain; get_brand_logo
+        # and get_brand_colors reuse it, and the index is built on first use
+        self._brand_cache: TTLCache = TTLCache(maxsize=1024, ttl=3600)
+        # Search results by (normalized query, limit); results shift more often
+        self._search_cache: TTLCache = TTLCache(maxsize=512, ttl=300)
+        # (ETag, entry) by cleaned domain, kept past the brand cache TTL so an
+        # expired entry is revalidated with If-None-Match instead of refetched
+        self._brand_etags: TTLCache = TTLCache(maxsize=1024, ttl=86400)
+        # In-flight brand fetches by cleaned domain; concurrent callers share one
+        self._inflight: Dict[str, "asyncio.Task[List[Any]]"] = {}
+
+    async def aclose(self) -> None:
+        """Close the underlying HTTP client."""
+        await self._client.aclose()
+
+    async def __aenter__(self) -> "BrandfetchClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def _get_with_retry(self, url: str, **kwargs) -> httpx.Response:
+        """
+        GET with exponential backoff and jitter on 429/502/503/504, honoring
+        Retry-After. Raises HTTPStatusError once retries are exhausted, or
+        straight away if the server asks for a wait longer than the cap.
+        A 304 for a conditional request is returned as-is.
+        """
+        attempt = 0
+        while True:
+            if self._rate_limiter is not None:
+                await self._rate_limiter.acquire()
+            response = await self._client.get(url, **kwargs)
+            if response.status_code == 200 or response.status_code == 304:
+                return response
+            if response.status_code not in _RETRY_STATUSES or attempt >= self.max_retries:
+                break
+            delay = min(_RETRY_CAP, _RETRY_BASE * 2 ** attempt) * (1 + random.random() * 0.5)
+            retry_after = _retry_after(response)
+            if retry_after is not None:
+                if retry_after > _RETRY_CAP:
+                    break
+                delay = max(delay, retry_after)
+            await asyncio.sleep(delay)
+            attempt += 1
+        response.raise_for_status()
+        return response
+
+    @property
+    def client_id(self) -> Optional[str]:
+        return self._client_id
+
+    @client_id.setter
+    def client_id(self, value: Optional[str]) -> None:
+        # Encode the c= param once rather than for every logo URL
+        self._client_id = value
+        self._client_id_param = urlencode({"c": value}) if value else ""
 
     def _append_client_id(self, url: str) -> str:
         """
         Append client ID to CDN URLs for Brandfetch hotlinking compliance.
         Only applies to cdn.brandfetch.io URLs.
         """
-        if not self.client_id:
+        if not self._client_id:
             return url
-        
-        parsed = urlparse(url)
-        if "cdn.brandfetch.io" not in parsed.netloc:
+
+        # Fast path: a plain CDN URL with no fragment or existing c= param
+        if url.startswith(_CDN_PREFIXES) and "#" not in url and "c=" not in url:
+            sep = "&" if "?" in url else "?"
+            return f"{url}{sep}{self._client_id_param}"
+
+        parts = urlsplit(url)
+        if "cdn.brandfetch.io" not in parts.netloc:
             return url
-        
-        # Parse existing query parameters
-        query_params = parse_qs(parsed.query)
-        query_params['c'] = [self.client_id]
-        
-        # Rebuild URL with client ID
-        new_parsed = parsed._replace(query=urlencode(query_params, doseq=True))
-        return urlunparse(new_parsed)
+
+        # Drop any existing c= param, keeping the rest of the query as-is
+        query = "&".join(p for p in parts.query.split("&") if p and not p.startswith("c="))
+        query = f"{query}&{self._client_id_param}" if query else self._client_id_param
+        return urlunsplit(parts._replace(query=query))
 
     def _clean_domain(self, domain: str) -> str:
         """Clean and normalize domain input."""
-        # Strip whitespace from input first
-        domain = domain.strip()
-        
-        # Parse URL to extract domain properly
-        parsed = urlparse(domain)
-        clean_domain = parsed.netloc or parsed.path  # netloc for URLs, path for plain domains
-        
-        # Remove www prefix (case-insensitive) and convert to lowercase
-        if clean_domain.lower().startswith("www."):
-            clean_domain = clean_domain[4:]  # Remove "www."
-        clean_domain = clean_domain.lower()
-        
-        return clean_domain.strip("/")  # Only strip slashes now
+        return _clean_domain(domain)
 
     async def get_brand(self, domain: str) -> Dict[str, Any]:
-        """Retrieve comprehensive brand data for a domain."""
-        # Clean domain input
-        domain = self._clean_domain(domain)
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/brands/{domain}",
-                headers=self.headers,
-                timeout=30.0,
-            )
-            response.raise_for_status()
-            return response.json()
+        """Retrieve comprehensive brand data for a domain (cached for an hour)."""
+        entry = await self._get_brand_entry(_clean_domain(domain))
+        return entry[0]
+
+    async def _get_brand_entry(self, domain: str) -> List[Any]:
+        """Cached [brand JSON, logo index] entry for an already-cleaned domain."""
+        cached = self._brand_cache.get(domain)
+        if cached is not None:
+            return cached
+
+        task = self._inflight.get(domain)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_brand_entry(domain))
+            self._inflight[domain] = task
+            task.add_done_callback(lambda _: self._inflight.pop(domain, None))
+        # shield so one cancelled caller does not cancel the fetch for the others
+        return await asyncio.shield(task)
+
+    async def _fetch_brand_entry(self, domain: str) -> List[Any]:
+        url = self._brands_url + quote(domain, safe="")
+        stale = self._brand_etags.get(domain)
+        if stale is None:
+            response = await self._get_with_retry(url)
+        else:
+            response = await self._get_with_retry(url, headers={"If-None-Match": stale[0]})
+
+        if response.status_code == 304 and stale is not None:
+            # Unchanged: reuse the decoded body and its logo index
+            entry = stale[1]
+        else:
+            entry = [orjson.loads(response.content), None]
+            etag = response.headers.get("ETag")
+            if etag:
+                self._brand_etags[domain] = (etag, entry)
+        self._brand_cache[domain] = entry
+        return entry
+
+    async def get_brands_bulk(self, domains: List[str], concurrency: int = 10) -> List[Dict[str, Any]]:
+        """
+        Retrieve brand data for several domains concurrently, in input order.
+        A failed lookup yields {"domain": ..., "error": ...} instead of raising.
+        """
+        sem = asyncio.Semaphore(concurrency)
+
+        async def _one(domain: str) -> Dict[str, Any]:
+            async with sem:
+                try:
+                    return await self.get_brand(domain)
+                except (httpx.HTTPError, ValueError) as e:
+                    return {"domain": domain, "error": str(e)}
+
+        return list(await asyncio.gather(*(_one(d) for d in domains)))
 
     async def search_brands(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Search for brands by name or keyword."""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/search",
-                headers=self.headers,
-                params={"q": query, "limit": min(limit, 50)},
-                timeout=30.0,
-            )
-            response.raise_for_status()
-            return response.json()
+        """Search for brands by name or keyword (cached for 5 minutes)."""
+        limit = min(limit, 50)
+        key = (query.strip().lower(), limit)
+        cached = self._search_cache.get(key)
+        if cached is not None:
+            return cached
+
+        response = await self._get_with_retry(
+            self._search_url,
+            params={"q": query, "limit": limit},
+        )
+        results = orjson.loads(response.content)
+        self._search_cache[key] = results
+        return results
 
     async def get_brand_logo(self, domain: str, format: str = "svg", theme: str = "light", type: str = "logo") -> Dict[str, Any]:
         """Retrieve brand logo in specified format."""
         # Clean domain input
-        domain = self._clean_domain(domain)
+        domain = _clean_domain(domain)
         
         # Get brand data first
-        brand_data = await self.get_brand(domain)
-        
-        # Find the best matching logo
-        logos = brand_data.get("logos", [])
-        best_logo = None
-        
-        # Filter by preferences
-        filtered_logos = []
-        for logo in logos:
-            if logo.get("theme") == theme and logo.get("type") == type:
-                filtered_logos.append(logo)
-        
-        # If no exact match, use any logo with preferred format
-        if not filtered_logos:
-            for logo in logos:
-                if logo.get("type") == type:
-                    filtered_logos.append(logo)
-        
-        # Still no match, use any logo
-        if not filtered_logos:
-            filtered_logos = logos
-        
-        if filtered_logos:
-            best_logo = filtered_logos[0]
-            
-            # Find the specific format
-            formats = best_logo.get("formats", [])
-            target_format = None
-            
-            for fmt in formats:
-                if fmt.get("format") == format:
-                    target_format = fmt
-                    break
-            
-            # If preferred format not found, use first available
-            if not target_format and formats:
-                target_format = formats[0]
-            
-            if target_format:
-                return {
-                    "url": self._append_client_id(target_format.get("src")),
-                    "format": target_format.get("format"),
-                    "theme": best_logo.get("theme"),
-                    "type": best_logo.get("type"),
-                    "metadata": {
-                        "size": target_format.get("size"),
-                        "width": target_format.get("width"),
-                        "height": target_format.get("height"),
-                        "background": best_logo.get("background")
-                    }
-                }
-        
-        raise ValueError(f"No logo found for {domain} with specified criteria")
+        entry = await self._get_brand_entry(domain)
+        logo = self._select_logo(entry, format, theme, type)
+        if logo is None:
+            raise ValueError(f"No logo found for {domain} with specified criteria")
+        return logo
 
     async def get_brand_colors(self, domain: str) -> List[Dict[str, Any]]:
         """Extract brand color palette."""
-        # Clean domain input
-        domain = self._clean_domain(domain)
-        
         # Get brand data first
         brand_data = await self.get_brand(domain)
+        return _enhance_colors(brand_data.get("colors", []))
+
+    async def get_brand_assets(self, domain: str, format: str = "svg", theme: str = "light", type: str = "logo") -> Dict[str, Any]:
+        """
+        Retrieve the logo and color palette from a single brand fetch.
+        "logo" is None when no logo matches instead of raising.
+        """
+        entry = await self._get_brand_entry(_clean_domain(domain))
+        return {
+            "logo": self._select_logo(entry, format, theme, type),
+            "colors": _enhance_colors(entry[0].get("colors", [])),
+        }
+
+    def _select_logo(self, entry: List[Any], format: str, theme: str, type: str) -> Optional[Dict[str, Any]]:
+        """Pick the best logo/format from a cached brand entry, or None."""
+        if entry[1] is None:
+            entry[1] = _index_logos(entry[0].get("logos", []))
+        by_type_theme, by_type, first = entry[1]
         
-        # Return colors with additional metadata
-        colors = brand_data.get("colors", [])
+        # Prefer a theme and type match, then any logo of the type, then any logo
+        best = by_type_theme.get((type, theme)) or by_type.get(type) or first
+        if not best:
+            return None
+        best_logo, formats = best
         
-        # Enhance color data
-        enhanced_colors = []
-        for color in colors:
-            enhanced_color = {
-                "hex": color.get("hex"),
-                "type": color.get("type", "unknown"),
-                "brightness": color.get("brightness", "unknown")
-            }
-            enhanced_colors.append(enhanced_color)
+        # Find the specific format, else use the first available
+        target_format = formats.get(format)
+        if not target_format and best_logo.get("formats"):
+            target_format = best_logo["formats"][0]
+        if not target_format:
+            return None
         
-        return enhanced_colors
\ No newline at end of file
+        return {
+            "url": self._append_client_id(target_format.get("src")),
+            "format": target_format.get("format"),
+            "theme": best_logo.get("theme"),
+            "type": best_logo.get("type"),
+            "metadata": {
+                "size": target_format.get("size"),
+                "width": target_format.get("width"),
+                "height": target_format.get("height"),
+                "background": best_logo.get("background")
+            }
+        }
@@ -2,17 +2,20 @@
 
 import asyncio
 import logging
-from typing import Any, Dict
+from functools import lru_cache
+from itertools import groupby, islice
+from typing import Any, Awaitable, Callable, Dict
 import httpx
+from cachetools import LRUCache
 from mcp.server import Server
 from mcp.types import Tool, TextContent
 from pydantic import AnyUrl
-from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+from .client import BrandfetchClient, _ensure_env
+
+# Load environment variables from .env file (once; the client shares the guard)
+_ensure_env()
 
-from .client import BrandfetchClient
 from . import brandfetch_logo_lookup_checked
 
 # Configure logging
@@ -28,18 +31,31 @@ try:
     brandfetch = BrandfetchClient()
     logger.info("Brandfetch client initialized successfully")
 except ValueError as e:
-    logger.error(f"Failed to initialize Brandfetch client: {e}")
+    logger.error("Failed to initialize Brandfetch client: %s", e)
     raise
 
 
+@lru_cache(maxsize=1024)
+def _intcomma(n: int) -> str:
+    """n with thousands separators; logo sizes repeat across calls."""
+    return format(n, ",")
+
+
+def _format_logo_line(logo: Dict[str, Any]) -> str:
+    """One summary line for a logo, using its first format."""
+    fmt = logo['formats'][0]
+    url = fmt.get('src', 'N/A')
+    short_url = url if len(url) <= 80 else f"{url[:80]}..."
+    return (
+        f"  - {logo.get('type', 'logo')} ({logo.get('theme', 'light')}, {fmt.get('format', 'unknown')}): "
+        f"{short_url} ({_intcomma(fmt.get('size', 0))} bytes)"
+    )
+
+
 def format_brand_details(data: Dict[str, Any]) -> str:
     """Format brand data for readability in Claude."""
-    lines = []
-    
     # Header
-    name = data.get('name', 'Unknown Brand')
-    domain = data.get('domain', 'N/A')
-    lines.append(f"# {name} ({domain})")
+    lines = [f"# {data.get('name', 'Unknown Brand')} ({data.get('domain', 'N/A')})"]
     
     # Description
     if desc := data.get('description'):
@@ -47,74 +63,48 @@ def format_brand_details(data: Dict[str, Any]) -> str:
     
     # Company info
     if company := data.get('company'):
-        lines.append(f"\n**Company Details:**")
+        lines.append("\n**Company Details:**")
         if employees := company.get('employees'):
             lines.append(f"  - Employees: {employees:,}")
         if founded := company.get('foundedYear'):
             lines.append(f"  - Founded: {founded}")
         if location := company.get('location'):
-            city = location.get('city', 'N/A')
-            country = location.get('country', 'N/A')
-            lines.append(f"  - Location: {city}, {country}")
+            lines.append(f"  - Location: {location.get('city', 'N/A')}, {location.get('country', 'N/A')}")
     
-    # Logos
-    logos = data.get('logos', [])
-    if logos:
+    # Logos (first 3)
+    if logos := data.get('logos'):
         lines.append(f"\n**Available Logos:** {len(logos)}")
-        for logo in logos[:3]:  # Show first 3
-            logo_type = logo.get('type', 'logo')
-            theme = logo.get('theme', 'light')
-            formats = logo.get('formats', [])
-            if formats:
-                format_info = formats[0]
-                url = format_info.get('src', 'N/A')
-                format_type = format_info.get('format', 'unknown')
-                size = format_info.get('size', 0)
-                lines.append(f"  - {logo_type} ({theme}, {format_type}): {url[:80]}{'...' if len(url) > 80 else ''} ({size:,} bytes)")
-        
-        if len(logos) > 3:
-            lines.append(f"  - ... and {len(logos) - 3} more")
-    
-    # Colors
-    colors = data.get('colors', [])
-    if colors:
-        lines.append(f"\n**Brand Colors:**")
-        for color in colors[:5]:  # Show first 5
-            hex_code = color.get('hex', '#000000')
-            color_type = color.get('type', 'unknown')
-            brightness = color.get('brightness', 'N/A')
-            lines.append(f"  - {hex_code} ({color_type}, brightness: {brightness})")
-        
-        if len(colors) > 5:
-            lines.append(f"  - ... and {len(colors) - 5} more")
+        lines.extend(_format_logo_line(logo) for logo in islice(logos, 3) if logo.get('formats'))
+        if (more := len(logos) - 3) > 0:
+            lines.append(f"  - ... and {more} more")
+    
+    # Colors (first 5)
+    if colors := data.get('colors'):
+        lines.append("\n**Brand Colors:**")
+        lines.extend(
+            f"  - {c.get('hex', '#000000')} ({c.get('type', 'unknown')}, brightness: {c.get('brightness', 'N/A')})"
+            for c in islice(colors, 5)
+        )
+        if (more := len(colors) - 5) > 0:
+            lines.append(f"  - ... and {more} more")
     
     # Fonts
-    fonts = data.get('fonts', [])
-    if fonts:
-        lines.append(f"\n**Typography:**")
-        for font in fonts:
-            name = font.get('name', 'Unknown')
-            font_type = font.get('type', 'body')
-            origin = font.get('origin', 'unknown')
-            lines.append(f"  - {name} ({font_type}, {origin})")
-    
-    # Social Links
-    links = data.get('links', [])
-    if links:
-        lines.append(f"\n**Social Media:**")
-        for link in links[:5]:  # Show first 5
-            platform = link.get('name', 'unknown')
-            url = link.get('url', '')
-            lines.append(f"  - {platform}: {url}")
-        
-        if len(links) > 5:
-            lines.append(f"  - ... and {len(links) - 5} more")
+    if fonts := data.get('fonts'):
+        lines.append("\n**Typography:**")
+        lines.extend(
+            f"  - {f.get('name', 'Unknown')} ({f.get('type', 'body')}, {f.get('origin', 'unknown')})"
+            for f in fonts
+        )
+    
+    # Social Links (first 5)
+    if links := data.get('links'):
+        lines.append("\n**Social Media:**")
+        lines.extend(f"  - {link.get('name', 'unknown')}: {link.get('url', '')}" for link in islice(links, 5))
+        if (more := len(links) - 5) > 0:
+            lines.append(f"  - ... and {more} more")
     
     # Additional info
-    if claimed := data.get('claimed'):
-        lines.append(f"\n**Brand Status:** ✓ Claimed")
-    else:
-        lines.append(f"\n**Brand Status:** Unclaimed")
+    lines.append("\n**Brand Status:** ✓ Claimed" if data.get('claimed') else "\n**Brand Status:** Unclaimed")
     
     if quality := data.get('qualityScore'):
         lines.append(f"**Quality Score:** {quality:.2%}")
@@ -158,7 +148,7 @@ def format_logo_response(logo: dict) -> str:
     if metadata := logo.get('metadata'):
         lines.append(f"\n**Details:**")
         if size := metadata.get('size'):
-            lines.append(f"  - Size: {size:,} bytes")
+            lines.append(f"  - Size: {_intcomma(size)} bytes")
         if width := metadata.get('width'):
             height = metadata.get('height', 0)
             lines.append(f"  - Dimensions: {width}x{height}px")
@@ -172,6 +162,21 @@ def format_logo_response(logo: dict) -> str:
     return "\n".join(lines)
 
 
+# Display order for color groups in format_colors_response
+_COLOR_TYPE_RANK = {
+    t: i for i, t in enumerate(('brand', 'accent', 'primary', 'secondary', 'dark', 'light', 'unknown'))
+}
+_COLOR_TYPE_HEADER = {t: f"**{t.title()} Colors:**" for t in _COLOR_TYPE_RANK}
+
+
+def _color_type(color: Dict[str, Any]) -> str:
+    return color.get('type', 'unknown')
+
+
+def _color_rank(color: Dict[str, Any]) -> int:
+    return _COLOR_TYPE_RANK[color.get('type', 'unknown')]
+
+
 def format_colors_response(colors: list) -> str:
     """Format color palette for readability."""
     if not colors:
@@ -179,227 +184,266 @@ def format_colors_response(colors: list) -> str:
     
     lines = [f"**Brand Color Palette:** {len(colors)} colors\n"]
     
-    # Group by type for better organization
-    by_type = {}
-    for color in colors:
-        color_type = color.get('type', 'unknown')
-        if color_type not in by_type:
-            by_type[color_type] = []
-        by_type[color_type].append(color)
-    
-    # Display in organized groups
-    type_order = ['brand', 'accent', 'primary', 'secondary', 'dark', 'light', 'unknown']
-    
-    for color_type in type_order:
-        if color_type in by_type:
-            lines.append(f"**{color_type.title()} Colors:**")
-            for color in by_type[color_type]:
-                hex_code = color.get('hex', '#000000')
-                brightness = color.get('brightness', 'N/A')
-                lines.append(f"  • {hex_code} (brightness: {brightness})")
-            lines.append("")
+    # Stable sort by display rank, then emit one section per type; types
+    # outside the display order are left out
+    ranked = sorted(
+        (c for c in colors if c.get('type', 'unknown') in _COLOR_TYPE_RANK),
+        key=_color_rank,
+    )
+    for color_type, group in groupby(ranked, key=_color_type):
+        lines.append(_COLOR_TYPE_HEADER[color_type])
+        lines.extend(
+            f"  • {color.get('hex', '#000000')} (brightness: {color.get('brightness', 'N/A')})"
+            for color in group
+        )
+        lines.append("")
     
     return "\n".join(lines).strip()
 
 
-@app.list_tools()
-async def list_tools() -> list[Tool]:
-    """List available MCP tools."""
-    return [
-        Tool(
-            name="get_brand_details",
-            description="Retrieve comprehensive brand information including logos, colors, fonts, and social links for a given domain",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "domain": {
-                        "type": "string",
-                        "description": "The company domain (e.g., 'github.com')",
-                    }
-                },
-                "required": ["domain"],
+# Tool definitions never change, so they are built once at import
+_TOOLS: list[Tool] = [
+    Tool(
+        name="get_brand_details",
+        description="Retrieve comprehensive brand information including logos, colors, fonts, and social links for a given domain",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "domain": {
+                    "type": "string",
+                    "description": "The company domain (e.g., 'github.com')",
+                }
             },
-        ),
-        Tool(
-            name="search_brands",
-            description="Search for brands by name or keyword. Returns a list of matching brands with basic information.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "query": {
-                        "type": "string",
-                        "description": "Search term or brand name",
-                    },
-                    "limit": {
-                        "type": "integer",
-                        "description": "Maximum number of results to return",
-                        "default": 10,
-                        "minimum": 1,
-                        "maximum": 50,
-                    },
+            "required": ["domain"],
+        },
+    ),
+    Tool(
+        name="search_brands",
+        description="Search for brands by name or keyword. Returns a list of matching brands with basic information.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Search term or brand name",
                 },
-                "required": ["query"],
-            },
-        ),
-        Tool(
-            name="get_brand_logo",
-            description="Retrieve brand logo in specified format. Returns logo URL and metadata.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "domain": {
-                        "type": "string",
-                        "description": "The company domain (e.g., 'stripe.com')",
-                    },
-                    "format": {
-                        "type": "string",
-                        "enum": ["svg", "png"],
-                        "description": "Desired logo format",
-                        "default": "svg",
-                    },
-                    "theme": {
-                        "type": "string",
-                        "enum": ["light", "dark"],
-                        "description": "Logo theme/color scheme",
-                        "default": "light",
-                    },
-                    "type": {
-                        "type": "string",
-                        "enum": ["logo", "icon", "symbol"],
-                        "description": "Type of logo asset",
-                        "default": "logo",
-                    },
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum number of results to return",
+                    "default": 10,
+                    "minimum": 1,
+                    "maximum": 50,
                 },
-                "required": ["domain"],
             },
-        ),
-        Tool(
-            name="get_brand_colors",
-            description="Extract the brand color palette with hex codes and color types (primary, secondary, accent, etc.)",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "domain": {
-                        "type": "string",
-                        "description": "The company domain (e.g., 'netflix.com')",
-                    }
+            "required": ["query"],
+        },
+    ),
+    Tool(
+        name="get_brand_logo",
+        description="Retrieve brand logo in specified format. Returns logo URL and metadata.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "domain": {
+                    "type": "string",
+                    "description": "The company domain (e.g., 'stripe.com')",
                 },
-                "required": ["domain"],
+                "format": {
+                    "type": "string",
+                    "enum": ["svg", "png"],
+                    "description": "Desired logo format",
+                    "default": "svg",
+                },
+                "theme": {
+                    "type": "string",
+                    "enum": ["light", "dark"],
+                    "description": "Logo theme/color scheme",
+                    "default": "light",
+                },
+                "type": {
+                    "type": "string",
+                    "enum": ["logo", "icon", "symbol"],
+                    "description": "Type of logo asset",
+                    "default": "logo",
+                },
+            },
+            "required": ["domain"],
+        },
+    ),
+    Tool(
+        name="get_brand_colors",
+        description="Extract the brand color palette with hex codes and color types (primary, secondary, accent, etc.)",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "domain": {
+                    "type": "string",
+                    "description": "The company domain (e.g., 'netflix.com')",
+                }
             },
-        ),
-        Tool(
-            name="get_logo_url",
-            description="Get a brand logo URL quickly using domain lookup or name search with heuristics. Returns the logo URL and source method used.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "domain": {
-                        "type": "string",
-                        "description": "The company domain (e.g., 'github.com') - preferred for fastest lookup",
-                    },
-                    "name": {
-                        "type": "string",
-                        "description": "Brand name to search (e.g., 'GitHub') - uses heuristics then API fallback",
-                    }
+            "required": ["domain"],
+        },
+    ),
+    Tool(
+        name="get_logo_url",
+        description="Get a brand logo URL quickly using domain lookup or name search with heuristics. Returns the logo URL and source method used.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "domain": {
+                    "type": "string",
+                    "description": "The company domain (e.g., 'github.com') - preferred for fastest lookup",
                 },
-                "oneOf": [
-                    {"required": ["domain"]},
-                    {"required": ["name"]}
-                ],
+                "name": {
+                    "type": "string",
+                    "description": "Brand name to search (e.g., 'GitHub') - uses heuristics then API fallback",
+                }
             },
-        ),
+            "oneOf": [
+                {"required": ["domain"]},
+                {"required": ["name"]}
+            ],
+        },
+    ),
+]
+
+
+@app.list_tools()
+async def list_tools() -> list[Tool]:
+    """List available MCP tools."""
+    # Shallow copy so a caller can't alter the shared list
+    return list(_TOOLS)
+
+
+# Bytes of an API error body echoed back to the caller
+_ERROR_BODY_LIMIT = 512
+
+# (brand dict, formatted text) by requested domain; only reused while the
+# client keeps returning that same dict object
+_BRAND_TEXT_CACHE: LRUCache = LRUCache(maxsize=256)
 
+
+async def _handle_get_brand_details(arguments: Dict[str, Any]) -> str:
+    domain = arguments["domain"]
+    result = await brandfetch.get_brand(domain)
+    
+    # A brand cache hit hands back the same dict, so its text can be reused
+    cached = _BRAND_TEXT_CACHE.get(domain)
+    if cached is not None and cached[0] is result:
+        return cached[1]
+    
+    # Format nicely for Claude
+    formatted = format_brand_details(result)
+    _BRAND_TEXT_CACHE[domain] = (result, formatted)
+    return formatted
+
+
+async def _handle_search_brands(arguments: Dict[str, Any]) -> str:
+    query = arguments["query"]
+    limit = arguments.get("limit", 10)
+    results = await brandfetch.search_brands(query, limit)
+    
+    # Format search results
+    formatted = format_search_results(results)
+    return formatted
+
+
+async def _handle_get_brand_logo(arguments: Dict[str, Any]) -> str:
+    domain = arguments["domain"]
+    format_type = arguments.get("format", "svg")
+    theme = arguments.get("theme", "light")
+    logo_type = arguments.get("type", "logo")
+    
+    logo = await brandfetch.get_brand_logo(domain, format_type, theme, logo_type)
+    
+    # Format logo response
+    formatted = format_logo_response(logo)
+    return formatted
+
+
+async def _handle_get_brand_colors(arguments: Dict[str, Any]) -> str:
+    domain = arguments["domain"]
+    colors = await brandfetch.get_brand_colors(domain)
+    
+    # Format colors response
+    formatted = format_colors_response(colors)
+    return formatted
+
+
+async def _handle_get_logo_url(arguments: Dict[str, Any]) -> str:
+    # Use the brandfetch_logo_lookup_checked module
+    domain = arguments.get("domain")
+    name_param = arguments.get("name")
+    
+    if domain:
+        result = await brandfetch_logo_lookup_checked.get_logo_for_domain(domain)
+    elif name_param:
+        # Use name directly as domain parameter, with company_hint for better search
+        result = await brandfetch_logo_lookup_checked.get_logo_for_domain(name_param, company_hint=name_param)
+    else:
+        raise ValueError("Either 'domain' or 'name' must be provided")
+    
+    # Format the result
+    if "error" in result:
+        return "❌ **No logo found**"
+    
+    lines = [
+        f"**Logo URL:** {result.get('logo_url', 'N/A')}",
+        f"**Source:** {result.get('source', 'unknown')}",
+        f"**Reason:** {result.get('reason', 'N/A')}",
     ]
+    if warning := result.get('warning'):
+        lines.append(f"**Warning:** {warning}")
+    if 'brand_api_calls_this_month' in result:
+        lines.append(f"**Brand API calls this month:** {result['brand_api_calls_this_month']}")
+    lines.append("")  # keep the trailing newline
+    
+    return "\n".join(lines)
+
+
+def _wrap(text: str) -> list[TextContent]:
+    """The single-text-item reply call_tool returns."""
+    return [TextContent(type="text", text=text)]
+
+
+# Tool name -> handler, resolved with one dict lookup per call
+_HANDLERS: Dict[str, Callable[[Dict[str, Any]], Awaitable[str]]] = {
+    "get_brand_details": _handle_get_brand_details,
+    "search_brands": _handle_search_brands,
+    "get_brand_logo": _handle_get_brand_logo,
+    "get_brand_colors": _handle_get_brand_colors,
+    "get_logo_url": _handle_get_logo_url,
+}
 
 
 @app.call_tool()
 async def call_tool(name: str, arguments: Dict[str, Any]) -> list[TextContent]:
     """Handle tool execution requests."""
+    handler = _HANDLERS.get(name)
+    if handler is None:
+        return _wrap(f"❌ Error: Unknown tool: {name}")
+    
     try:
-        if name == "get_brand_details":
-            domain = arguments["domain"]
-            result = await brandfetch.get_brand(domain)
-            
-            # Format nicely for Claude
-            formatted = format_brand_details(result)
-            return [TextContent(type="text", text=formatted)]
-        
-        elif name == "search_brands":
-            query = arguments["query"]
-            limit = arguments.get("limit", 10)
-            results = await brandfetch.search_brands(query, limit)
-            
-            # Format search results
-            formatted = format_search_results(results)
-            return [TextContent(type="text", text=formatted)]
-        
-        elif name == "get_brand_logo":
-            domain = arguments["domain"]
-            format_type = arguments.get("format", "svg")
-            theme = arguments.get("theme", "light")
-            logo_type = arguments.get("type", "logo")
-            
-            logo = await brandfetch.get_brand_logo(domain, format_type, theme, logo_type)
-            
-            # Format logo response
-            formatted = format_logo_response(logo)
-            return [TextContent(type="text", text=formatted)]
-        
-        elif name == "get_brand_colors":
-            domain = arguments["domain"]
-            colors = await brandfetch.get_brand_colors(domain)
-            
-            # Format colors response
-            formatted = format_colors_response(colors)
-            return [TextContent(type="text", text=formatted)]
-        
-        elif name == "get_logo_url":
-            # Use the brandfetch_logo_lookup_checked module
-            domain = arguments.get("domain")
-            name_param = arguments.get("name")
-            
-            if domain:
-                result = await brandfetch_logo_lookup_checked.get_logo_for_domain(domain)
-            elif name_param:
-                # Use name directly as domain parameter, with company_hint for better search
-                result = await brandfetch_logo_lookup_checked.get_logo_for_domain(name_param, company_hint=name_param)
-            else:
-                raise ValueError("Either 'domain' or 'name' must be provided")
-            
-            # Format the result
-            if "error" in result:
-                formatted = f"❌ **No logo found**"
-            else:
-                formatted = f"**Logo URL:** {result.get('logo_url', 'N/A')}\n"
-                formatted += f"**Source:** {result.get('source', 'unknown')}\n"
-                formatted += f"**Reason:** {result.get('reason', 'N/A')}\n"
-                if result.get('warning'):
-                    formatted += f"**Warning:** {result.get('warning')}\n"
-                if 'brand_api_calls_this_month' in result:
-                    formatted += f"**Brand API calls this month:** {result.get('brand_api_calls_this_month')}\n"
-            
-            return [TextContent(type="text", text=formatted)]
-        
-        else:
-            return [TextContent(type="text", text=f"❌ Error: Unknown tool: {name}")]
+        return _wrap(await handler(arguments))
     
     except httpx.HTTPStatusError as e:
         status_code = e.response.status_code
-        error_text = e.response.text
-        logger.error(f"HTTP error executing tool {name}: {e}")
-        return [TextContent(type="text", text=f"❌ API Error: API error ({status_code}): {error_text}")]
+        # Bounded, so a large HTML error page doesn't flood the reply
+        error_text = e.response.content[:_ERROR_BODY_LIMIT].decode("utf-8", "replace")
+        logger.error("HTTP error executing tool %s: %s", name, e)
+        return _wrap(f"❌ API Error: API error ({status_code}): {error_text}")
     
     except KeyError as e:
-        logger.error(f"Missing parameter error executing tool {name}: {e}")
-        return [TextContent(type="text", text=f"❌ Error: Missing required parameter: {str(e)}")]
+        logger.error("Missing parameter error executing tool %s: %s", name, e)
+        return _wrap(f"❌ Error: Missing required parameter: {str(e)}")
     
     except ValueError as e:
-        logger.error(f"Value error executing tool {name}: {e}")
-        return [TextContent(type="text", text=f"❌ Error: {str(e)}")]
+        logger.error("Value error executing tool %s: %s", name, e)
+        return _wrap(f"❌ Error: {str(e)}")
     
     except Exception as e:
-        logger.error(f"Error executing tool {name}: {e}")
-        return [TextContent(type="text", text=f"❌ Error: Unexpected error executing {name}: {str(e)}")]
+        logger.error("Error executing tool %s: %s", name, e)
+        return _wrap(f"❌ Error: Unexpected error executing {name}: {str(e)}")
 
 
 def main():
@@ -411,20 +455,31 @@ def main():
         from mcp.server.stdio import stdio_server
         from mcp.types import InitializationOptions, ServerCapabilities, ToolsCapability
         
-        async with stdio_server() as (read_stream, write_stream):
-            await app.run(
-                read_stream, 
-                write_stream, 
-                InitializationOptions(
-                    server_name="brandfetch",
-                    server_version="0.2.0",
-                    capabilities=ServerCapabilities(
-                        tools=ToolsCapability()
+        try:
+            async with stdio_server() as (read_stream, write_stream):
+                await app.run(
+                    read_stream, 
+                    write_stream, 
+                    InitializationOptions(
+                        server_name="brandfetch",
+                        server_version="0.2.0",
+                        capabilities=ServerCapabilities(
+                            tools=ToolsCapability()
+                        )
                     )
                 )
-            )
+        finally:
+            # Release pooled connections held by the client and the logo lookup module
+            await brandfetch.aclose()
+            await brandfetch_logo_lookup_checked.aclose()
     
-    asyncio.run(run_server())
+    # Prefer uvloop's libuv-backed event loop when the optional extra is installed
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(run_server())
+    else:
+        uvloop.run(run_server())
 
 
 if __name__ == "__main__":
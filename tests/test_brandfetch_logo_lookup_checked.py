@@ -8,13 +8,21 @@ import sqlite3
 
 from brandfetch_mcp.brandfetch_logo_lookup_checked import (
     get_logo_for_domain,
+    get_logos_for_domains,
     get_brand_count,
     increment_brand_counter,
+    reserve_brand_call,
     get_status,
     call_logo_api,
     call_brand_api_search,
     _domain_matches_logo_candidates,
     _find_image_urls_in_obj,
+    _url_formatter,
+    _parse_json,
+    _append_client_id,
+    _current_month,
+    _close_conn,
+    _LOGO_CACHE,
 )
 
 
@@ -32,6 +40,7 @@ class TestDatabaseFunctions:
 
     def teardown_method(self):
         """Clean up the temporary database."""
+        _close_conn()
         self.db_patcher.stop()
         os.unlink(self.temp_db.name)
 
@@ -54,6 +63,33 @@ class TestDatabaseFunctions:
         count = get_brand_count()
         assert count == 3
 
+    def test_reserve_brand_call(self):
+        """Test reservations stop at the limit without going over."""
+        assert reserve_brand_call(2) == 1
+        assert reserve_brand_call(2) == 2
+        assert reserve_brand_call(2) is None
+        assert get_brand_count() == 2
+
+    def test_reserve_brand_call_zero_limit(self):
+        """Test a zero limit never reserves a call."""
+        assert reserve_brand_call(0) is None
+        assert get_brand_count() == 0
+
+    def test_reconnect_to_recreated_db(self):
+        """Test a fresh file at the same path gets its table on reconnect."""
+        increment_brand_counter(1)
+        _close_conn()
+        os.unlink(self.temp_db.name)
+        open(self.temp_db.name, "w").close()
+
+        assert get_brand_count() == 0
+
+    def test_current_month(self):
+        """Test the cached month matches the current UTC month."""
+        from datetime import datetime, timezone
+        assert _current_month() == datetime.now(timezone.utc).strftime("%Y-%m")
+        assert _current_month() is _current_month()
+
     def test_get_status(self):
         """Test getting status information."""
         increment_brand_counter(5)
@@ -95,6 +131,51 @@ class TestURLExtraction:
         assert len(urls) == 1
         assert urls[0] == "https://example.com/logo.svg"
 
+    def test_find_image_urls_preserves_document_order(self):
+        """Test nested URLs are returned in the order they appear."""
+        obj = {
+            "logos": [{"src": "https://example.com/a.svg"}, "see https://example.com/b.png"],
+            "brand": {"icon": "https://example.com/c.ico"},
+            "banner": "https://example.com/d.png",
+        }
+        urls = _find_image_urls_in_obj(obj)
+        assert urls == [
+            "https://example.com/a.svg",
+            "https://example.com/b.png",
+            "https://example.com/c.ico",
+            "https://example.com/d.png",
+        ]
+
+    def test_url_formatter(self):
+        """Test URL templates are filled for both fast and fallback paths."""
+        fast = _url_formatter("https://api.brandfetch.io/v2/logo/{domain}", "domain")
+        assert fast("apple.com") == "https://api.brandfetch.io/v2/logo/apple.com"
+
+        slow = _url_formatter("https://example.com/{domain}/{domain}", "domain")
+        assert slow("apple.com") == "https://example.com/apple.com/apple.com"
+
+    def test_parse_json(self):
+        """Test JSON bodies parse and anything else yields None."""
+        resp = MagicMock()
+        for body, expected in [
+            (b'  {"a": 1}', {"a": 1}),
+            (b'[1, 2]', [1, 2]),
+            (b'{broken', None),
+            (b'<html></html>', None),
+            (b'', None),
+        ]:
+            resp.content = body
+            assert _parse_json(resp) == expected
+
+    def test_append_client_id(self):
+        """Test the client ID is added to CDN URLs only, replacing any existing one."""
+        with patch('brandfetch_mcp.brandfetch_logo_lookup_checked.CLIENT_ID', 'cid'):
+            assert _append_client_id("https://cdn.brandfetch.io/apple.com") == "https://cdn.brandfetch.io/apple.com?c=cid"
+            assert _append_client_id("https://cdn.brandfetch.io/apple.com?w=64") == "https://cdn.brandfetch.io/apple.com?w=64&c=cid"
+            assert _append_client_id("https://cdn.brandfetch.io/apple.com?c=old") == "https://cdn.brandfetch.io/apple.com?c=cid"
+            assert _append_client_id("https://cdn.brandfetch.io/apple.com?abc=1&c=old#top") == "https://cdn.brandfetch.io/apple.com?abc=1&c=cid#top"
+            assert _append_client_id("https://example.com/logo.png") == "https://example.com/logo.png"
+
     def test_domain_matches_logo_candidates(self):
         """Test domain matching logic."""
         domain = "apple.com"
@@ -102,6 +183,18 @@ class TestURLExtraction:
         
         assert _domain_matches_logo_candidates(domain, candidates) == True
 
+    def test_domain_matches_logo_candidates_nested_json_field(self):
+        """Test domain matching via a host field nested under data/brand."""
+        assert _domain_matches_logo_candidates("apple.com", [], {"data": {"website": "https://www.Apple.com"}})
+        assert not _domain_matches_logo_candidates("apple.com", [], {"brand": {"url": "https://example.com"}})
+
+    def test_domain_matches_logo_candidates_case_insensitive(self):
+        """Test candidate matching ignores case and skips empty entries."""
+        candidates = ["", "https://example.com/x.png", "https://CDN.Example.org/Apple.COM/logo.svg"]
+
+        assert _domain_matches_logo_candidates("Apple.com", candidates)
+        assert not _domain_matches_logo_candidates("pple.comhttps", candidates)
+
     def test_domain_matches_logo_candidates_no_match(self):
         """Test domain matching when no match exists."""
         domain = "apple.com"
@@ -129,10 +222,11 @@ class TestAPICallers:
         mock_response.headers = {"content-type": "application/json"}
         mock_response.json.return_value = {"logo": "https://example.com/logo.svg"}
         mock_response.text = '{"logo": "https://example.com/logo.svg"}'
+        mock_response.content = mock_response.text.encode()
 
-        with patch('brandfetch_mcp.brandfetch_logo_lookup_checked.httpx.AsyncClient') as mock_client, \
+        with patch('brandfetch_mcp.brandfetch_logo_lookup_checked._http_client') as mock_client, \
              patch('brandfetch_mcp.brandfetch_logo_lookup_checked.LOGO_API_KEY', 'test_key'):
-            mock_client.return_value.__aenter__.return_value.get.return_value = mock_response
+            mock_client.get = AsyncMock(return_value=mock_response)
             
             result = await call_logo_api("apple.com")
             
@@ -155,16 +249,53 @@ class TestAPICallers:
         mock_response.headers = {"content-type": "application/json"}
         mock_response.json.return_value = [{"domain": "apple.com", "logo": "https://example.com/logo.svg"}]
         mock_response.text = '[{"domain": "apple.com", "logo": "https://example.com/logo.svg"}]'
+        mock_response.content = mock_response.text.encode()
 
-        with patch('brandfetch_mcp.brandfetch_logo_lookup_checked.httpx.AsyncClient') as mock_client, \
+        with patch('brandfetch_mcp.brandfetch_logo_lookup_checked._http_client') as mock_client, \
              patch('brandfetch_mcp.brandfetch_logo_lookup_checked.BRAND_API_KEY', 'test_key'):
-            mock_client.return_value.__aenter__.return_value.get.return_value = mock_response
+            mock_client.get = AsyncMock(return_value=mock_response)
             
             result = await call_brand_api_search("apple")
             
             assert result["status_code"] == 200
             assert len(result["candidates"]) > 0
 
+    @pytest.mark.asyncio
+    async def test_call_brand_api_search_non_json_body(self):
+        """Test URLs are scanned from the raw text when the body isn't JSON."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.headers = {"content-type": "text/html"}
+        mock_response.text = '<img src="https://example.com/logo.png">'
+        mock_response.content = mock_response.text.encode()
+
+        with patch('brandfetch_mcp.brandfetch_logo_lookup_checked._http_client') as mock_client, \
+             patch('brandfetch_mcp.brandfetch_logo_lookup_checked.BRAND_API_KEY', 'test_key'):
+            mock_client.get = AsyncMock(return_value=mock_response)
+
+            result = await call_brand_api_search("apple")
+
+            assert result["json"] is None
+            assert result["candidates"] == ["https://example.com/logo.png"]
+
+    @pytest.mark.asyncio
+    async def test_call_logo_api_deadline(self):
+        """Test a hung request is abandoned once the wall-clock deadline passes."""
+        import asyncio
+
+        async def hang(*args, **kwargs):
+            await asyncio.sleep(10)
+
+        with patch('brandfetch_mcp.brandfetch_logo_lookup_checked._http_client') as mock_client, \
+             patch('brandfetch_mcp.brandfetch_logo_lookup_checked._REQUEST_DEADLINE', 0.01), \
+             patch('brandfetch_mcp.brandfetch_logo_lookup_checked.LOGO_API_KEY', 'test_key'):
+            mock_client.get = hang
+
+            result = await call_logo_api("apple.com")
+
+            assert result["status_code"] is None
+            assert result["candidates"] == []
+
     @pytest.mark.asyncio
     async def test_call_brand_api_search_missing_key(self):
         """Test brand API search call with missing API key."""
@@ -178,6 +309,7 @@ class TestGetLogoForDomain:
 
     def setup_method(self):
         """Set up test environment."""
+        _LOGO_CACHE.clear()
         self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
         self.temp_db.close()
         
@@ -187,6 +319,7 @@ class TestGetLogoForDomain:
 
     def teardown_method(self):
         """Clean up test environment."""
+        _close_conn()
         self.db_patcher.stop()
         os.unlink(self.temp_db.name)
 
@@ -226,8 +359,7 @@ class TestGetLogoForDomain:
 
         with patch('brandfetch_mcp.brandfetch_logo_lookup_checked.call_logo_api', new_callable=AsyncMock) as mock_logo_api, \
              patch('brandfetch_mcp.brandfetch_logo_lookup_checked.call_brand_api_search', new_callable=AsyncMock) as mock_brand_api, \
-             patch('brandfetch_mcp.brandfetch_logo_lookup_checked.get_brand_count', return_value=0), \
-             patch('brandfetch_mcp.brandfetch_logo_lookup_checked.increment_brand_counter', return_value=1):
+             patch('brandfetch_mcp.brandfetch_logo_lookup_checked.reserve_brand_call', return_value=1):
             
             mock_logo_api.return_value = mock_domain_resp
             mock_brand_api.return_value = mock_brand_resp
@@ -250,6 +382,7 @@ class TestGetLogoForDomain:
 
         with patch('brandfetch_mcp.brandfetch_logo_lookup_checked.call_logo_api', new_callable=AsyncMock) as mock_logo_api, \
              patch('brandfetch_mcp.brandfetch_logo_lookup_checked.get_brand_count', return_value=100), \
+             patch('brandfetch_mcp.brandfetch_logo_lookup_checked.reserve_brand_call', return_value=None), \
              patch('brandfetch_mcp.brandfetch_logo_lookup_checked.BRAND_API_MONTH_LIMIT', 100):
             
             mock_logo_api.return_value = mock_domain_resp
@@ -276,8 +409,7 @@ class TestGetLogoForDomain:
 
         with patch('brandfetch_mcp.brandfetch_logo_lookup_checked.call_logo_api', new_callable=AsyncMock) as mock_logo_api, \
              patch('brandfetch_mcp.brandfetch_logo_lookup_checked.call_brand_api_search', new_callable=AsyncMock) as mock_brand_api, \
-             patch('brandfetch_mcp.brandfetch_logo_lookup_checked.get_brand_count', return_value=0), \
-             patch('brandfetch_mcp.brandfetch_logo_lookup_checked.increment_brand_counter', return_value=1):
+             patch('brandfetch_mcp.brandfetch_logo_lookup_checked.reserve_brand_call', return_value=1):
             
             mock_logo_api.return_value = mock_domain_resp
             mock_brand_api.return_value = mock_brand_resp
@@ -312,8 +444,7 @@ class TestGetLogoForDomain:
 
         with patch('brandfetch_mcp.brandfetch_logo_lookup_checked.call_logo_api', new_callable=AsyncMock) as mock_logo_api, \
              patch('brandfetch_mcp.brandfetch_logo_lookup_checked.call_brand_api_search', new_callable=AsyncMock) as mock_brand_api, \
-             patch('brandfetch_mcp.brandfetch_logo_lookup_checked.get_brand_count', return_value=0), \
-             patch('brandfetch_mcp.brandfetch_logo_lookup_checked.increment_brand_counter', return_value=1):
+             patch('brandfetch_mcp.brandfetch_logo_lookup_checked.reserve_brand_call', return_value=1):
             
             mock_logo_api.return_value = mock_domain_resp
             mock_brand_api.return_value = mock_brand_resp
@@ -323,6 +454,24 @@ class TestGetLogoForDomain:
             assert result["logo_url"] == "https://cdn.brandfetch.io/apple.com/logo.svg"
             mock_brand_api.assert_called_once_with("Apple Inc")
 
+    @pytest.mark.asyncio
+    async def test_brand_name_also_probes_guessed_domain(self):
+        """Test a bare name is looked up alongside name + .com before the Brand API."""
+        async def fake_logo_api(domain):
+            if domain == "github.com":
+                return {"status_code": 200, "candidates": ["https://cdn.brandfetch.io/github.com/logo.svg"], "json": {}}
+            return {"status_code": 404, "candidates": [], "json": None}
+
+        with patch('brandfetch_mcp.brandfetch_logo_lookup_checked.call_logo_api', side_effect=fake_logo_api) as mock_logo_api, \
+             patch('brandfetch_mcp.brandfetch_logo_lookup_checked.call_brand_api_search', new_callable=AsyncMock) as mock_brand_api:
+
+            result = await get_logo_for_domain("GitHub", company_hint="GitHub")
+
+            assert result["logo_url"] == "https://cdn.brandfetch.io/github.com/logo.svg"
+            assert result["source"] == "domain-logo"
+            assert [c.args[0] for c in mock_logo_api.call_args_list] == ["github", "github.com"]
+            mock_brand_api.assert_not_called()
+
     @pytest.mark.asyncio
     async def test_warning_threshold(self):
         """Test warning when approaching limit."""
@@ -339,9 +488,8 @@ class TestGetLogoForDomain:
 
         with patch('brandfetch_mcp.brandfetch_logo_lookup_checked.call_logo_api', new_callable=AsyncMock) as mock_logo_api, \
              patch('brandfetch_mcp.brandfetch_logo_lookup_checked.call_brand_api_search', new_callable=AsyncMock) as mock_brand_api, \
-             patch('brandfetch_mcp.brandfetch_logo_lookup_checked.get_brand_count', return_value=95), \
-             patch('brandfetch_mcp.brandfetch_logo_lookup_checked.BRAND_API_WARN_THRESHOLD', 90), \
-             patch('brandfetch_mcp.brandfetch_logo_lookup_checked.increment_brand_counter', return_value=96):
+             patch('brandfetch_mcp.brandfetch_logo_lookup_checked.reserve_brand_call', return_value=96), \
+             patch('brandfetch_mcp.brandfetch_logo_lookup_checked.BRAND_API_WARN_THRESHOLD', 90):
             
             mock_logo_api.return_value = mock_domain_resp
             mock_brand_api.return_value = mock_brand_resp
@@ -352,3 +500,129 @@ class TestGetLogoForDomain:
             assert result["source"] == "brand-search"
             assert "warning" in result
             assert "approaching" in result["warning"].lower()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_lookups_are_coalesced(self):
+        """Test concurrent lookups for the same domain share one API call."""
+        import asyncio
+
+        mock_domain_resp = {
+            "status_code": 200,
+            "candidates": ["https://cdn.brandfetch.io/apple.com/logo.svg"],
+            "json": {"domain": "apple.com"}
+        }
+
+        async def slow_logo_api(domain):
+            await asyncio.sleep(0.01)
+            return mock_domain_resp
+
+        with patch('brandfetch_mcp.brandfetch_logo_lookup_checked.call_logo_api', new_callable=AsyncMock) as mock_logo_api:
+            mock_logo_api.side_effect = slow_logo_api
+
+            results = await asyncio.gather(*[get_logo_for_domain("apple.com") for _ in range(5)])
+
+            assert all(r["logo_url"] == "https://cdn.brandfetch.io/apple.com/logo.svg" for r in results)
+            mock_logo_api.assert_called_once_with("apple.com")
+
+    @pytest.mark.asyncio
+    async def test_repeat_lookup_served_from_cache(self):
+        """Test a repeated lookup returns the cached result without API calls."""
+        mock_domain_resp = {
+            "status_code": 200,
+            "candidates": ["https://cdn.brandfetch.io/apple.com/logo.svg"],
+            "json": {"domain": "apple.com"}
+        }
+
+        with patch('brandfetch_mcp.brandfetch_logo_lookup_checked.call_logo_api', new_callable=AsyncMock) as mock_logo_api:
+            mock_logo_api.return_value = mock_domain_resp
+
+            first = await get_logo_for_domain("apple.com")
+            second = await get_logo_for_domain("Apple.com ")
+
+            assert second == first
+            mock_logo_api.assert_called_once_with("apple.com")
+
+    @pytest.mark.asyncio
+    async def test_limit_reached_not_cached(self):
+        """Test transient errors such as the quota limit are not cached."""
+        mock_domain_resp = {
+            "status_code": 200,
+            "candidates": [],
+            "json": {}
+        }
+
+        with patch('brandfetch_mcp.brandfetch_logo_lookup_checked.call_logo_api', new_callable=AsyncMock) as mock_logo_api, \
+             patch('brandfetch_mcp.brandfetch_logo_lookup_checked.get_brand_count', return_value=100), \
+             patch('brandfetch_mcp.brandfetch_logo_lookup_checked.reserve_brand_call', return_value=None), \
+             patch('brandfetch_mcp.brandfetch_logo_lookup_checked.BRAND_API_MONTH_LIMIT', 100):
+            mock_logo_api.return_value = mock_domain_resp
+
+            await get_logo_for_domain("apple.com")
+            await get_logo_for_domain("apple.com")
+
+            assert mock_logo_api.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_batch_lookup_serializes_brand_fallbacks(self):
+        """Test batch lookups keep input order and never overlap Brand API calls."""
+        import asyncio
+
+        active = 0
+        max_active = 0
+
+        async def fake_logo_api(domain):
+            if domain == "apple.com":
+                return {"status_code": 200, "candidates": ["https://cdn.brandfetch.io/apple.com/logo.svg"], "json": {}}
+            return {"status_code": 404, "candidates": [], "json": None}
+
+        async def fake_brand_search(query):
+            nonlocal active, max_active
+            active += 1
+            max_active = max(max_active, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return {"status_code": 200, "candidates": [f"https://example.com/{query}.png"], "json": []}
+
+        with patch('brandfetch_mcp.brandfetch_logo_lookup_checked.call_logo_api', side_effect=fake_logo_api), \
+             patch('brandfetch_mcp.brandfetch_logo_lookup_checked.call_brand_api_search', side_effect=fake_brand_search):
+            results = await get_logos_for_domains(["a.io", "apple.com", "b.io"])
+
+        assert [r["logo_url"] for r in results] == [
+            "https://example.com/a.io.png",
+            "https://cdn.brandfetch.io/apple.com/logo.svg",
+            "https://example.com/b.io.png",
+        ]
+        assert max_active == 1
+        assert get_brand_count() == 2
+
+    @pytest.mark.asyncio
+    async def test_network_error_refunds_reserved_call(self):
+        """Test a Brand API network error does not count against the quota."""
+        mock_domain_resp = {"status_code": 404, "candidates": [], "json": None}
+        mock_brand_resp = {"status_code": None, "error": "boom", "json": None, "candidates": []}
+
+        with patch('brandfetch_mcp.brandfetch_logo_lookup_checked.call_logo_api', new_callable=AsyncMock) as mock_logo_api, \
+             patch('brandfetch_mcp.brandfetch_logo_lookup_checked.call_brand_api_search', new_callable=AsyncMock) as mock_brand_api:
+            mock_logo_api.return_value = mock_domain_resp
+            mock_brand_api.return_value = mock_brand_resp
+
+            result = await get_logo_for_domain("apple.com")
+
+            assert result["error"] == "brand_api_network_error"
+            assert result["brand_api_calls_this_month"] == 0
+            assert get_brand_count() == 0
+
+    @pytest.mark.asyncio
+    async def test_raising_brand_api_call_refunds_reserved_call(self):
+        """Test an exception from the Brand API call hands the reservation back."""
+        mock_domain_resp = {"status_code": 404, "candidates": [], "json": None}
+
+        with patch('brandfetch_mcp.brandfetch_logo_lookup_checked.call_logo_api', new_callable=AsyncMock) as mock_logo_api, \
+             patch('brandfetch_mcp.brandfetch_logo_lookup_checked.call_brand_api_search', new_callable=AsyncMock) as mock_brand_api:
+            mock_logo_api.return_value = mock_domain_resp
+            mock_brand_api.side_effect = RuntimeError("Missing BRANDFETCH_API_KEY environment variable")
+
+            with pytest.raises(RuntimeError):
+                await get_logo_for_domain("apple.com")
+
+            assert get_brand_count() == 0
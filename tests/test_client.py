@@ -1,9 +1,16 @@
 import pytest
 import os
 import httpx
-from unittest.mock import patch
+from unittest.mock import patch, AsyncMock
 import respx
-from brandfetch_mcp.client import BrandfetchClient
+from brandfetch_mcp.client import BrandfetchClient, _TokenBucket
+
+
+@pytest.fixture(autouse=True)
+def no_retry_sleep():
+    """Skip real backoff sleeps between retries."""
+    with patch("brandfetch_mcp.client.asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+        yield mock_sleep
 
 
 class TestBrandfetchClientInit:
@@ -17,6 +24,7 @@ class TestBrandfetchClientInit:
             assert client.base_url == "https://api.brandfetch.io/v2"
             assert "Authorization" in client.headers
             assert client.headers["Authorization"] == "Bearer test_key"
+            assert client._client.headers["Authorization"] == "Bearer test_key"
     
     def test_init_with_client_id(self):
         """Test initialization with client ID."""
@@ -40,6 +48,53 @@ class TestBrandfetchClientInit:
                 BrandfetchClient()
 
 
+class TestClientLifecycle:
+    """Test the shared HTTP client is reused and closed."""
+
+    @respx.mock
+    async def test_context_manager_reuses_and_closes_client(self):
+        """Test requests share one HTTP client that is closed on exit."""
+        respx.get("https://api.brandfetch.io/v2/brands/test.com").mock(
+            return_value=httpx.Response(200, json={"name": "Test"})
+        )
+
+        with patch.dict(os.environ, {"BRANDFETCH_API_KEY": "test_key"}):
+            async with BrandfetchClient() as client:
+                http = client._client
+                await client.get_brand("test.com")
+                await client.get_brand("test.com")
+                assert client._client is http
+
+            assert http.is_closed
+
+
+class TestTokenBucket:
+    """Test the client-side rate limiter."""
+
+    async def test_bucket_waits_once_burst_is_spent(self, no_retry_sleep):
+        """Test acquires beyond the burst wait for tokens to refill."""
+        clock = [100.0]
+
+        async def advance(delay):
+            clock[0] += delay
+
+        no_retry_sleep.side_effect = advance
+        with patch("brandfetch_mcp.client.time.monotonic", side_effect=lambda: clock[0]):
+            bucket = _TokenBucket(rate=2, capacity=2)
+            for _ in range(3):
+                await bucket.acquire()
+
+        # Two burst tokens, then half a second for the third at 2/s
+        assert no_retry_sleep.await_count == 1
+        assert no_retry_sleep.await_args.args[0] == pytest.approx(0.5)
+
+    @pytest.mark.parametrize("value", ["fast", "0", "-5"])
+    def test_invalid_rate_limit_uses_default(self, value):
+        """Test a malformed or non-positive BRANDFETCH_MAX_RPS falls back to 10/s."""
+        with patch.dict(os.environ, {"BRANDFETCH_API_KEY": "test_key", "BRANDFETCH_MAX_RPS": value}):
+            assert BrandfetchClient()._rate_limiter.rate == 10.0
+
+
 class TestAppendClientId:
     """Test client ID URL appending functionality."""
     
@@ -101,6 +156,15 @@ class TestAppendClientId:
             assert "c=old_client" not in result
             assert "foo=bar" in result
 
+    def test_append_client_id_fragment_and_similar_params(self):
+        """Test fragments survive and params merely ending in c= are kept."""
+        with patch.dict(os.environ, {"BRANDFETCH_API_KEY": "test_key"}):
+            client = BrandfetchClient()
+            client.client_id = "new_client"
+
+            url = "https://cdn.brandfetch.io/test.png?abc=1&c=old#top"
+            assert client._append_client_id(url) == "https://cdn.brandfetch.io/test.png?abc=1&c=new_client#top"
+
 
 class TestGetBrand:
     """Test get_brand method functionality."""
@@ -155,6 +219,87 @@ class TestGetBrand:
                 result = await client.get_brand(domain)
                 assert result["name"] == "Test"
     
+    @respx.mock
+    async def test_get_brand_cached(self):
+        """Test repeat lookups for the same cleaned domain hit the cache."""
+        route = respx.get("https://api.brandfetch.io/v2/brands/test.com").mock(
+            return_value=httpx.Response(200, json={"name": "Test", "logos": [], "colors": []})
+        )
+
+        with patch.dict(os.environ, {"BRANDFETCH_API_KEY": "test_key"}):
+            client = BrandfetchClient()
+            await client.get_brand("test.com")
+            await client.get_brand("https://www.test.com/")
+            await client.get_brand_colors("test.com")
+
+            assert route.call_count == 1
+
+    @respx.mock
+    async def test_expired_brand_is_revalidated_with_etag(self):
+        """Test an expired entry sends If-None-Match and reuses the body on 304."""
+        route = respx.get("https://api.brandfetch.io/v2/brands/test.com").mock(
+            side_effect=[
+                httpx.Response(200, json={"name": "Test", "colors": []}, headers={"ETag": '"v1"'}),
+                httpx.Response(304),
+            ]
+        )
+
+        with patch.dict(os.environ, {"BRANDFETCH_API_KEY": "test_key"}):
+            client = BrandfetchClient()
+            first = await client.get_brand("test.com")
+            client._brand_cache.clear()
+            second = await client.get_brand("test.com")
+
+            assert second is first
+            assert "If-None-Match" not in route.calls[0].request.headers
+            assert route.calls[1].request.headers["If-None-Match"] == '"v1"'
+
+    @respx.mock
+    async def test_concurrent_get_brand_calls_are_coalesced(self):
+        """Test concurrent callers for one domain share a single request."""
+        import asyncio
+
+        route = respx.get("https://api.brandfetch.io/v2/brands/test.com").mock(
+            return_value=httpx.Response(200, json={
+                "name": "Test",
+                "colors": [{"hex": "#000000", "type": "dark"}],
+                "logos": [{"type": "logo", "theme": "light", "formats": [{"format": "svg", "src": "https://example.com/l.svg"}]}],
+            })
+        )
+
+        with patch.dict(os.environ, {"BRANDFETCH_API_KEY": "test_key"}):
+            client = BrandfetchClient()
+            brand, colors, logo = await asyncio.gather(
+                client.get_brand("test.com"),
+                client.get_brand_colors("www.test.com"),
+                client.get_brand_logo("https://test.com"),
+            )
+
+            assert brand["name"] == "Test"
+            assert colors[0]["hex"] == "#000000"
+            assert logo["url"] == "https://example.com/l.svg"
+            assert route.call_count == 1
+            assert client._inflight == {}
+
+    @respx.mock
+    async def test_get_brand_errors_not_cached(self):
+        """Test failed lookups are retried rather than cached."""
+        route = respx.get("https://api.brandfetch.io/v2/brands/test.com").mock(
+            side_effect=[
+                httpx.Response(500, json={"error": "boom"}),
+                httpx.Response(200, json={"name": "Test"}),
+            ]
+        )
+
+        with patch.dict(os.environ, {"BRANDFETCH_API_KEY": "test_key"}):
+            client = BrandfetchClient()
+            with pytest.raises(httpx.HTTPStatusError):
+                await client.get_brand("test.com")
+            result = await client.get_brand("test.com")
+
+            assert result["name"] == "Test"
+            assert route.call_count == 2
+
     @respx.mock
     async def test_get_brand_http_errors(self):
         """Test HTTP error handling."""
@@ -185,6 +330,41 @@ class TestGetBrand:
             with pytest.raises(httpx.HTTPStatusError):
                 await client.get_brand("ratelimited.com")
     
+    @respx.mock
+    async def test_get_brand_retries_transient_errors(self, no_retry_sleep):
+        """Test 429/5xx responses are retried with backoff honoring Retry-After."""
+        route = respx.get("https://api.brandfetch.io/v2/brands/test.com").mock(
+            side_effect=[
+                httpx.Response(429, headers={"Retry-After": "5"}),
+                httpx.Response(503),
+                httpx.Response(200, json={"name": "Test"}),
+            ]
+        )
+
+        with patch.dict(os.environ, {"BRANDFETCH_API_KEY": "test_key"}):
+            client = BrandfetchClient()
+            result = await client.get_brand("test.com")
+
+            assert result["name"] == "Test"
+            assert route.call_count == 3
+            delays = [call.args[0] for call in no_retry_sleep.await_args_list]
+            assert delays[0] >= 5
+            assert 2 <= delays[1] <= 3
+
+    @respx.mock
+    async def test_get_brand_gives_up_on_long_retry_after(self):
+        """Test a Retry-After beyond the backoff cap fails fast."""
+        route = respx.get("https://api.brandfetch.io/v2/brands/test.com").mock(
+            return_value=httpx.Response(429, headers={"Retry-After": "3600"})
+        )
+
+        with patch.dict(os.environ, {"BRANDFETCH_API_KEY": "test_key"}):
+            client = BrandfetchClient()
+            with pytest.raises(httpx.HTTPStatusError):
+                await client.get_brand("test.com")
+
+            assert route.call_count == 1
+
     @respx.mock
     async def test_get_brand_timeout(self):
         """Test timeout handling."""
@@ -200,6 +380,32 @@ class TestGetBrand:
                 await client.get_brand("slow.com")
 
 
+class TestGetBrandsBulk:
+    """Test get_brands_bulk method functionality."""
+
+    @respx.mock
+    async def test_get_brands_bulk_keeps_order_and_reports_errors(self):
+        """Test results come back in input order with per-domain errors."""
+        respx.get("https://api.brandfetch.io/v2/brands/a.com").mock(
+            return_value=httpx.Response(200, json={"name": "A"})
+        )
+        respx.get("https://api.brandfetch.io/v2/brands/missing.com").mock(
+            return_value=httpx.Response(404, json={"error": "Not found"})
+        )
+        respx.get("https://api.brandfetch.io/v2/brands/b.com").mock(
+            return_value=httpx.Response(200, json={"name": "B"})
+        )
+
+        with patch.dict(os.environ, {"BRANDFETCH_API_KEY": "test_key"}):
+            client = BrandfetchClient()
+            results = await client.get_brands_bulk(["a.com", "missing.com", "b.com"], concurrency=2)
+
+            assert results[0]["name"] == "A"
+            assert results[1]["domain"] == "missing.com"
+            assert "404" in results[1]["error"]
+            assert results[2]["name"] == "B"
+
+
 class TestSearchBrands:
     """Test search_brands method functionality."""
     
@@ -222,6 +428,21 @@ class TestSearchBrands:
             assert len(result) == 2
             assert result[0]["name"] == "GitHub"
     
+    @respx.mock
+    async def test_search_brands_cached(self):
+        """Test repeat searches differing only in case/whitespace hit the cache."""
+        route = respx.get("https://api.brandfetch.io/v2/search").mock(
+            return_value=httpx.Response(200, json=[{"name": "GitHub", "domain": "github.com"}])
+        )
+
+        with patch.dict(os.environ, {"BRANDFETCH_API_KEY": "test_key"}):
+            client = BrandfetchClient()
+            await client.search_brands("git", limit=5)
+            await client.search_brands(" Git ", limit=5)
+            await client.search_brands("git", limit=6)
+
+            assert route.call_count == 2
+
     @respx.mock
     async def test_search_brands_limit_validation(self):
         """Test limit parameter handling."""
@@ -371,6 +592,25 @@ class TestGetBrandLogo:
             
             assert result["format"] in ["svg", "png"]
     
+    @respx.mock
+    async def test_get_brand_logo_repeat_calls_use_cache(self, mock_brand_data):
+        """Test different logo selections for one brand share a single fetch."""
+        route = respx.get("https://api.brandfetch.io/v2/brands/test.com").mock(
+            return_value=httpx.Response(200, json=mock_brand_data)
+        )
+
+        with patch.dict(os.environ, {"BRANDFETCH_API_KEY": "test_key"}):
+            client = BrandfetchClient()
+            # Exact URLs below; a client ID from the environment or .env would add ?c=
+            client.client_id = None
+            dark = await client.get_brand_logo("test.com", format="png", theme="dark", type="logo")
+            icon = await client.get_brand_logo("test.com", format="png", theme="dark", type="icon")
+
+            assert dark["url"] == "https://cdn.brandfetch.io/dark.png"
+            # No dark icon and no png icon: first icon, first format
+            assert icon["url"] == "https://cdn.brandfetch.io/icon.svg"
+            assert route.call_count == 1
+
     @respx.mock
     async def test_get_brand_logo_no_logos(self):
         """Test error when no logos are available."""
@@ -504,9 +744,63 @@ class TestGetBrandColors:
             assert result == []
 
 
+class TestGetBrandAssets:
+    """Test get_brand_assets method functionality."""
+
+    @respx.mock
+    async def test_get_brand_assets_single_fetch(self):
+        """Test logo and colors come from one brand request."""
+        route = respx.get("https://api.brandfetch.io/v2/brands/test.com").mock(
+            return_value=httpx.Response(200, json={
+                "logos": [{"type": "logo", "theme": "dark", "formats": [{"format": "png", "src": "https://example.com/d.png"}]}],
+                "colors": [{"hex": "#FF0000", "type": "brand"}],
+            })
+        )
+
+        with patch.dict(os.environ, {"BRANDFETCH_API_KEY": "test_key"}):
+            client = BrandfetchClient()
+            assets = await client.get_brand_assets("test.com", theme="dark")
+
+            assert assets["logo"]["url"] == "https://example.com/d.png"
+            assert assets["colors"] == [{"hex": "#FF0000", "type": "brand", "brightness": "unknown"}]
+            assert route.call_count == 1
+
+    @respx.mock
+    async def test_get_brand_assets_without_logos(self):
+        """Test a brand without logos yields logo None rather than raising."""
+        respx.get("https://api.brandfetch.io/v2/brands/test.com").mock(
+            return_value=httpx.Response(200, json={"colors": []})
+        )
+
+        with patch.dict(os.environ, {"BRANDFETCH_API_KEY": "test_key"}):
+            client = BrandfetchClient()
+            assets = await client.get_brand_assets("test.com")
+
+            assert assets == {"logo": None, "colors": []}
+
+
 class TestDomainCleaning:
     """Test domain cleaning logic used across multiple methods."""
     
+    def test_clean_domain_strips_port_query_and_fragment(self):
+        """Test ports, query strings and fragments are dropped."""
+        with patch.dict(os.environ, {"BRANDFETCH_API_KEY": "test_key"}):
+            client = BrandfetchClient()
+
+            assert client._clean_domain("https://Test.com:8443/x") == "test.com"
+            assert client._clean_domain("test.com?ref=1") == "test.com"
+            assert client._clean_domain("www.test.com#top") == "test.com"
+            assert client._clean_domain("   ") == ""
+
+    def test_clean_domain_other_schemes(self):
+        """Test non-http schemes are dropped and a bare scheme cleans to empty."""
+        with patch.dict(os.environ, {"BRANDFETCH_API_KEY": "test_key"}):
+            client = BrandfetchClient()
+            assert client._clean_domain("ftp://x.com") == "x.com"
+            assert client._clean_domain("HTTPS://WWW.x.com/a") == "x.com"
+            assert client._clean_domain("https://") == ""
+            assert client._clean_domain("localhost:8080") == "localhost"
+
     @respx.mock
     async def test_domain_cleaning_comprehensive(self):
         """Test comprehensive domain cleaning edge cases."""
@@ -76,6 +76,24 @@ class TestToolHandlers:
         assert "github.com" in result[0].text
         mock_brandfetch_client.get_brand.assert_called_once_with("github.com")
 
+    @pytest.mark.asyncio
+    async def test_get_brand_details_reuses_text_for_same_brand(self, mock_brandfetch_client):
+        """Test formatted text is reused only while get_brand returns the same dict."""
+        brand = {"name": "Cached", "domain": "cached.com"}
+        mock_brandfetch_client.get_brand.return_value = brand
+
+        with patch('brandfetch_mcp.server.format_brand_details', wraps=format_brand_details) as fmt:
+            first = await call_tool("get_brand_details", {"domain": "cached.com"})
+            second = await call_tool("get_brand_details", {"domain": "cached.com"})
+            assert fmt.call_count == 1
+
+            mock_brandfetch_client.get_brand.return_value = {"name": "Fresh", "domain": "cached.com"}
+            third = await call_tool("get_brand_details", {"domain": "cached.com"})
+            assert fmt.call_count == 2
+
+        assert first[0].text == second[0].text
+        assert "Fresh" in third[0].text
+
     @pytest.mark.asyncio
     async def test_search_brands_tool(self, mock_brandfetch_client):
         """Test search_brands tool through MCP interface."""
@@ -214,7 +232,7 @@ class TestErrorResponseFormat:
         """Test HTTPStatusError is formatted correctly for MCP."""
         mock_response = MagicMock()
         mock_response.status_code = 404
-        mock_response.text = "Not found"
+        mock_response.content = b"Not found"
         mock_brandfetch_client.get_brand.side_effect = httpx.HTTPStatusError(
             "Not found", request=MagicMock(), response=mock_response
         )
@@ -225,6 +243,20 @@ class TestErrorResponseFormat:
         assert result[0].type == "text"
         assert "❌ API Error: API error (404): Not found" == result[0].text
 
+    @pytest.mark.asyncio
+    async def test_http_error_body_is_truncated(self, mock_brandfetch_client):
+        """Test large API error bodies are cut to a bounded prefix."""
+        mock_response = MagicMock()
+        mock_response.status_code = 502
+        mock_response.content = b"x" * 10_000
+        mock_brandfetch_client.get_brand.side_effect = httpx.HTTPStatusError(
+            "Bad gateway", request=MagicMock(), response=mock_response
+        )
+
+        result = await call_tool("get_brand_details", {"domain": "github.com"})
+
+        assert result[0].text == "❌ API Error: API error (502): " + "x" * 512
+
     @pytest.mark.asyncio
     async def test_unexpected_error_formatting(self, mock_brandfetch_client):
         """Test unexpected exceptions are formatted correctly."""
@@ -453,7 +485,7 @@ class TestAuthErrors:
         """Test 401 unauthorized error formatting."""
         mock_response = MagicMock()
         mock_response.status_code = 401
-        mock_response.text = "Unauthorized"
+        mock_response.content = b"Unauthorized"
         mock_brandfetch_client.get_brand.side_effect = httpx.HTTPStatusError(
             "Unauthorized", request=MagicMock(), response=mock_response
         )
@@ -468,7 +500,7 @@ class TestAuthErrors:
         """Test rate limit error handling."""
         mock_response = MagicMock()
         mock_response.status_code = 429
-        mock_response.text = "Too many requests"
+        mock_response.content = b"Too many requests"
         mock_brandfetch_client.get_brand.side_effect = httpx.HTTPStatusError(
             "Too many requests", request=MagicMock(), response=mock_response
         )